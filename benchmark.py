@@ -0,0 +1,337 @@
+"""
+Rendering benchmarks for StageDeck.
+
+Runs offscreen, no display needed:
+
+    python benchmark.py --fields 150 --iterations 50
+"""
+import os
+import sys
+import time
+import ctypes
+import random
+import argparse
+from collections import Counter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPainter, QFont, QColor
+from PyQt5.QtWidgets import QApplication
+
+def draw_field_uncached(field, painter):
+    """Field drawing as it was before text layouts were cached (reference for comparison)"""
+    if field.show_border:
+        painter.setPen(QColor("white"))
+        painter.drawRect(0, 0, field.width() - 1, field.height() - 1)
+    title_font = QFont(field.title.font_family, field.title.font_size)
+    painter.setFont(title_font)
+    title_metrics = painter.fontMetrics()
+    painter.setPen(QColor(field.title.font_color))
+    title_y = 10
+    painter.drawText(0, title_y, field.width(), title_metrics.height(), Qt.AlignCenter, field.title.text)
+    content_font = QFont(field.content.font_family, field.content.font_size)
+    painter.setFont(content_font)
+    content_height = painter.fontMetrics().height()
+    painter.setPen(QColor(field.content.font_color))
+    content_y = title_y + title_metrics.height() + 10
+    remaining_height = field.height() - content_y - 10
+    lines = field.content.text.split('\n')
+    current_y = content_y + (remaining_height - len(lines) * content_height) // 2
+    for line in lines:
+        painter.drawText(0, current_y, field.width(), content_height, Qt.AlignCenter, line)
+        current_y += content_height
+
+def create_display(field_count):
+    """Create an offscreen display window with a grid of fields"""
+    import main
+    window = main.DisplayWindow()
+    window.setAttribute(Qt.WA_DontShowOnScreen)
+    window.setFixedSize(1920, 1080)
+    columns = 12
+    for i in range(field_count):
+        x = (i % columns) * 160
+        y = (i // columns) * 90 % 1080
+        window.add_field(f"field{i}", x, y, 150, 80, title_text=f"Field {i}",
+                         title_font_size=12, content_font_size=16)
+        window.fields[f"field{i}"].content.text = f"{i:04d}\n12:00:00"
+    window.show()
+    return window
+
+def time_draws(fields, draw, iterations):
+    """Average time in microseconds to draw one field"""
+    image = QImage(1920, 1080, QImage.Format_ARGB32)
+    painter = QPainter(image)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for field in fields:
+            painter.save()
+            painter.translate(field.pos())
+            draw(field, painter)
+            painter.restore()
+    elapsed = time.perf_counter() - start
+    painter.end()
+    return elapsed / (iterations * len(fields)) * 1e6
+
+def benchmark_field_paint(window, iterations):
+    fields = list(window.fields.values())
+    print(f"Per-field paint cost, {len(fields)} fields, {iterations} iterations")
+
+    legacy = time_draws(fields, draw_field_uncached, iterations)
+    print(f"  uncached (before):       {legacy:8.1f} us")
+
+    def draw_rebuilding(field, painter):
+        field._layout_version = None
+        field.draw(painter)
+    rebuild = time_draws(fields, draw_rebuilding, iterations)
+    print(f"  layout rebuilt (change): {rebuild:8.1f} us")
+
+    cached = time_draws(fields, lambda field, painter: field.draw(painter), iterations)
+    print(f"  cached layout (after):   {cached:8.1f} us  ({legacy / cached:.1f}x faster)")
+
+def benchmark_composite(window, iterations):
+    fields = list(window.fields.values())
+    cache = window.field_cache
+    print(f"Full frame composite, {len(fields)} fields, {iterations} iterations")
+
+    def composite(change_every):
+        start = time.perf_counter()
+        for i in range(iterations):
+            if change_every:
+                # Change every n-th field, like clocks updating
+                for field in fields[i % change_every::change_every]:
+                    field.content.text = f"{i:04d}\n12:00:{i % 60:02d}"
+            window.invalidate_frame()
+            window.compose_frame()
+        return (time.perf_counter() - start) / iterations * 1000.0
+
+    for label, change_every in (("no field changed", 0), ("1 in 10 fields changed", 10),
+                                ("every field changed", 1)):
+        hits, misses = cache.hits, cache.misses
+        elapsed = composite(change_every)
+        print(f"  {label + ':':25s} {elapsed:7.2f} ms  "
+              f"(cache hits {cache.hits - hits}, misses {cache.misses - misses})")
+    print(f"  cache: {cache.stats()}")
+
+def benchmark_invalidation(window, app, seconds):
+    fields = list(window.fields.values())
+    print(f"Field repaints, {len(fields)} fields, {seconds:.0f} s per case")
+
+    def run(step):
+        for field in fields:
+            field.paint_count = 0
+        end = time.perf_counter() + seconds
+        frames = 0
+        while time.perf_counter() < end:
+            if step:
+                step(frames)
+            frames += 1
+            app.processEvents()
+            window.compose_frame()
+            time.sleep(1 / 30)
+        painted = [field.paint_count for field in fields]
+        return sum(painted) / seconds, sum(1 for count in painted if count == 0)
+
+    rate, idle = run(None)
+    print(f"  idle:                    {rate:7.1f} field paints/s, {idle} fields never painted")
+
+    # Simulate a 4:3 NDI source at 30 fps, which leaves bars at the sides of a 16:9 window
+    source = QImage(640, 480, QImage.Format_ARGB32)
+    def ndi_frame(frame):
+        source.fill(QColor(frame % 255, 0, 0))
+        window._update_ndi_frame(source.copy())
+    ndi_frame(0)
+    window.compose_frame()
+    outside = sum(1 for field in fields if not window.get_ndi_rect().intersects(field.geometry()))
+    rate, idle = run(ndi_frame)
+    print(f"  NDI video under fields:  {rate:7.1f} field paints/s, "
+          f"{idle} of {outside} fields outside the video never painted")
+
+    window.ndi_frame = None
+    window.update()
+
+def benchmark_scene(app, field_count, iterations):
+    print(f"Scene with {field_count} fields")
+    start = time.perf_counter()
+    window = create_display(field_count)
+    window.compose_frame()
+    print(f"  load and first frame:    {(time.perf_counter() - start) * 1000.0:8.1f} ms")
+
+    fields = list(window.fields.values())
+    start = time.perf_counter()
+    for i, field in enumerate(fields):
+        field.content.text = f"{i:04d}\n12:00:01"
+        field.update()
+    window.compose_frame()
+    elapsed = time.perf_counter() - start
+    print(f"  update every field:      {elapsed * 1000.0:8.1f} ms  ({field_count / elapsed:,.0f} updates/s)")
+
+    # A few fields per frame, like clocks and scores ticking
+    start = time.perf_counter()
+    for i in range(iterations):
+        for field in fields[i % 50::50]:
+            field.content.text = f"{i:04d}\n12:00:{i % 60:02d}"
+            field.update()
+        window.compose_frame()
+    elapsed = (time.perf_counter() - start) / iterations
+    print(f"  1 in 50 changed per frame: {elapsed * 1000.0:6.1f} ms")
+
+    # Editing fields from the control panel changes them in place
+    start = time.perf_counter()
+    for i, field in enumerate(fields):
+        window.add_field(field.field_id, field.x(), field.y(), field.width(), field.height(),
+                         title_text=f"Edited {i}", title_font_size=12, content_font_size=16)
+    window.compose_frame()
+    elapsed = time.perf_counter() - start
+    print(f"  edit every field:        {elapsed * 1000.0:8.1f} ms  ({field_count / elapsed:,.0f} edits/s)")
+    window.close()
+
+def benchmark_ndi_conversion(iterations):
+    import video_sources
+    print(f"NDI frame receive cost per resolution, {iterations} frames")
+    for width, height in ((1280, 720), (1920, 1080), (3840, 2160)):
+        pool = video_sources.FramePool()
+        bgra = (ctypes.c_ubyte * (width * height * 4))()
+        uyvy = (ctypes.c_ubyte * (width * height * 2))()
+        ctypes.memset(uyvy, 128, len(uyvy))
+
+        def run(receive, buffer, stride):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                frame = receive(ctypes.addressof(buffer), width, height, stride)
+            return (time.perf_counter() - start) / iterations * 1000.0
+
+        copy = run(pool.copy_frame, bgra, width * 4)
+        convert = run(pool.convert_uyvy, uyvy, width * 2)
+        print(f"  {width}x{height}: BGRA copy {copy:6.2f} ms ({len(bgra) / 1e6:5.1f} MB), "
+              f"UYVY convert {convert:6.2f} ms ({len(uyvy) / 1e6:5.1f} MB)")
+
+def benchmark_video_throughput(app, seconds):
+    import video_sources
+    print(f"Background video end to end (synthetic source, as fast as possible), {seconds:.0f} s per case")
+    window = create_display(0)
+    for width, height in ((1280, 720), (1920, 1080), (3840, 2160)):
+        source = video_sources.SyntheticSource(width, height, fps=0)
+        window.set_video_source(source)
+        composited = window.frames_composited
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            app.processEvents()
+        elapsed = time.perf_counter() - start
+        window.set_video_source(None)
+        received = source.frames_received / elapsed
+        shown = (window.frames_composited - composited) / elapsed
+        print(f"  {width}x{height}: {received:6.1f} frames/s received, {shown:6.1f} frames/s composited, "
+              f"{source.latency_ms:5.1f} ms capture to screen")
+    window.close()
+
+def benchmark_static_skip(app, seconds):
+    import video_sources
+    print(f"Unchanged background video (synthetic 1920x1080 at 50 fps), {seconds:.0f} s per case")
+    window = create_display(0)
+    for label, moving, skip in (("moving picture", True, True), ("still, no skipping", False, False),
+                                ("still, skipped", False, True)):
+        source = video_sources.SyntheticSource(1920, 1080, fps=50, moving=moving)
+        source.skip_static = skip
+        window.set_video_source(source)
+        scaled = window.ndi_frames_scaled
+        composited = window.frames_composited
+        cpu = time.process_time()
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            app.processEvents()
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+        window.set_video_source(None)
+        print(f"  {label + ':':20s} {source.frames_static / elapsed:5.1f} skipped/s, "
+              f"{(window.ndi_frames_scaled - scaled) / elapsed:5.1f} scaled/s, "
+              f"{(window.frames_composited - composited) / elapsed:5.1f} composited/s, "
+              f"{cpu / elapsed * 100.0:5.1f}% CPU")
+    window.close()
+
+def pacing_quality(shown, interval):
+    """Judder (RMS ms), repeated frames and uneven gaps of a list of (output time, source frame index)"""
+    deviations = []
+    gaps = []
+    repeats = 0
+    for (last_time, last_index), (time_shown, index) in zip(shown, shown[1:]):
+        if index == last_index:
+            repeats += 1
+            continue
+        gaps.append(index - last_index)
+        deviations.append((time_shown - last_time) - (index - last_index) * interval)
+    judder = (sum(d * d for d in deviations) / max(1, len(deviations))) ** 0.5 * 1000.0
+    usual = Counter(gaps).most_common(1)[0][0] if gaps else 0
+    return judder, repeats, sum(1 for gap in gaps if gap != usual)
+
+def benchmark_pacing(seconds):
+    from frame_pacer import FramePacer
+    stream_interval = 0.033
+    print(f"Stream pacing, {seconds:.0f} s of simulated video with 2 ms arrival jitter, {stream_interval * 1000:.0f} ms stream cap")
+    for fps in (25.0, 50.0, 59.94):
+        interval = 1.0 / fps
+        rng = random.Random(1)
+        arrivals = [(index * interval + 0.005 + rng.uniform(-0.002, 0.002), index)
+                    for index in range(int(seconds * fps))]
+
+        # Fixed timer: every 33 ms take whatever frame arrived last
+        fixed = []
+        newest = None
+        frames = iter(arrivals)
+        pending = next(frames, None)
+        tick = 0.0
+        while pending is not None:
+            while pending is not None and pending[0] <= tick:
+                newest = pending[1]
+                pending = next(frames, None)
+            if newest is not None:
+                fixed.append((tick, newest))
+            tick += stream_interval
+
+        # Pacer ticks locked to the source, streaming every n-th tick
+        pacer = FramePacer()
+        paced = []
+        frames = iter(arrivals)
+        pending = next(frames, None)
+        while pending is not None or pacer.queue:
+            while pending is not None and (pacer.next_tick is None or pending[0] <= pacer.next_tick):
+                pacer.push(pending[1], pending[0], pending[1] * interval, fps)
+                pending = next(frames, None)
+            every = pacer.decimation(stream_interval)
+            stream_tick = pacer.ticks % every == 0
+            tick = pacer.next_tick
+            selected = pacer.tick()
+            if stream_tick and selected is not None:
+                paced.append((tick, selected[0]))
+
+        for label, shown in (("fixed 33 ms timer", fixed), ("paced", paced)):
+            judder, repeats, uneven = pacing_quality(shown, interval)
+            rate = len(shown) / seconds
+            print(f"  {fps:5.2f} fps source, {label + ':':18s} {rate:5.1f} fps out, {judder:5.1f} ms judder, "
+                  f"{repeats} repeated, {uneven} uneven gaps")
+        print(f"  {fps:5.2f} fps display ticks: {pacer.stats()}")
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="StageDeck rendering benchmarks")
+    parser.add_argument('--fields', type=int, default=150, help="number of fields")
+    parser.add_argument('--iterations', type=int, default=50, help="frames per measurement")
+    parser.add_argument('--scene-fields', type=int, default=1000, help="number of fields for the scene benchmark")
+    parser.add_argument('--seconds', type=float, default=2.0, help="duration of timed measurements")
+    args = parser.parse_args(argv[1:])
+
+    app = QApplication(argv[:1])
+    window = create_display(args.fields)
+    app.processEvents()
+    benchmark_field_paint(window, args.iterations)
+    benchmark_composite(window, args.iterations)
+    benchmark_invalidation(window, app, args.seconds)
+    window.close()
+    benchmark_scene(app, args.scene_fields, args.iterations)
+    benchmark_ndi_conversion(args.iterations)
+    benchmark_video_throughput(app, args.seconds)
+    benchmark_pacing(60.0)
+    benchmark_static_skip(app, args.seconds)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,265 @@
+import json
+import time
+import socket
+import struct
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+import web_server
+
+RING_HEADER = struct.Struct("<Q")  # Latest published sequence (0 = nothing yet)
+SLOT_HEADER = struct.Struct("<QQI")  # Sequence written first, sequence written last, payload length
+RECORD_HEADER = struct.Struct("<BHB")  # Record kind, rendition max width, rendition quality
+RECORD_FRAME = 1  # Payload is a binary frame message (see web_server.FRAME_HEADER)
+RECORD_STATE = 2  # Payload is the field model as JSON
+
+DEFAULT_SLOTS = 8
+DEFAULT_SLOT_SIZE = 4 * 1024 * 1024  # Big enough for a 4K keyframe
+
+class FrameRing:
+    """
+    Ring buffer of encoded frames in shared memory.
+
+    One writer publishes records with increasing sequence numbers, any number of
+    processes read them. Each slot is bracketed by its sequence number written
+    before and after the payload, so readers detect slots that were overwritten
+    while they copied them instead of taking a lock.
+    """
+
+    def __init__(self, name: Optional[str] = None, slots: int = DEFAULT_SLOTS,
+                 slot_size: int = DEFAULT_SLOT_SIZE, create: bool = False):
+        self.slots = slots
+        self.slot_size = slot_size
+        self.slot_stride = SLOT_HEADER.size + slot_size
+        size = RING_HEADER.size + slots * self.slot_stride
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        if create:
+            self.buf[:RING_HEADER.size] = bytes(RING_HEADER.size)
+
+    def latest(self) -> int:
+        """Sequence number of the newest record"""
+        return RING_HEADER.unpack_from(self.buf, 0)[0]
+
+    def _slot_offset(self, sequence: int) -> int:
+        return RING_HEADER.size + (sequence % self.slots) * self.slot_stride
+
+    def publish(self, kind: int, rendition: Tuple[int, int], payload: bytes) -> Optional[int]:
+        """Write a record into the next slot (single writer). Returns its sequence, or None if too big."""
+        length = RECORD_HEADER.size + len(payload)
+        if length > self.slot_size:
+            print(f"Frame of {length} bytes does not fit the {self.slot_size} byte frame bus slots, dropping it")
+            return None
+
+        sequence = self.latest() + 1
+        offset = self._slot_offset(sequence)
+        data_offset = offset + SLOT_HEADER.size
+        # Mark the slot as being rewritten before touching the payload
+        struct.pack_into("<Q", self.buf, offset, sequence)
+        RECORD_HEADER.pack_into(self.buf, data_offset, kind, rendition[0], rendition[1])
+        self.buf[data_offset + RECORD_HEADER.size:data_offset + length] = payload
+        SLOT_HEADER.pack_into(self.buf, offset, sequence, sequence, length)
+        RING_HEADER.pack_into(self.buf, 0, sequence)
+        return sequence
+
+    def read(self, sequence: int):
+        """Copy a record out of the ring. Returns (kind, rendition, payload), or None if it was overwritten."""
+        offset = self._slot_offset(sequence)
+        _, end_sequence, length = SLOT_HEADER.unpack_from(self.buf, offset)
+        if end_sequence != sequence or length > self.slot_size:
+            return None
+        data_offset = offset + SLOT_HEADER.size
+        kind, max_width, quality = RECORD_HEADER.unpack_from(self.buf, data_offset)
+        payload = bytes(self.buf[data_offset + RECORD_HEADER.size:data_offset + length])
+        # The writer bumps the first sequence before overwriting, so check it after copying
+        start_sequence = struct.unpack_from("<Q", self.buf, offset)[0]
+        if start_sequence != sequence:
+            return None
+        return kind, (max_width, quality), payload
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+def _read_ring(ring: FrameRing, condition, control):
+    """Worker thread: forward new ring records to the local web server as they are published"""
+    last = ring.latest()
+    while True:
+        with condition:
+            if ring.latest() == last:
+                condition.wait(1.0)
+        latest = ring.latest()
+        if latest == last:
+            continue
+
+        lost = latest - last > ring.slots
+        for sequence in range(max(last + 1, latest - ring.slots + 1), latest + 1):
+            record = ring.read(sequence)
+            if record is None:
+                lost = True
+                continue
+            kind, rendition, payload = record
+            if kind == RECORD_FRAME:
+                web_server.broadcast_message(payload, rendition)
+            elif kind == RECORD_STATE:
+                web_server.publish_state(json.loads(payload))
+        last = latest
+
+        if lost:
+            # Viewers may have missed delta tiles, start everyone over from a keyframe
+            control.put(("keyframe", None))
+
+def run_web_worker(worker_id: int, ring_name: str, slots: int, slot_size: int,
+                   condition, control, listen_socket, host: str, port: int):
+    """Entry point of a web server process"""
+    ring = FrameRing(ring_name, slots, slot_size)
+
+    def report_status():
+        control.put(("status", worker_id, web_server.has_clients(), web_server.has_state_clients(),
+                     web_server.active_renditions()))
+
+    web_server.set_connections_changed_callback(report_status)
+    web_server.set_client_connected_callback(lambda rendition: control.put(("keyframe", rendition)))
+    web_server.set_state_requested_callback(lambda: control.put(("state",)))
+    threading.Thread(target=_read_ring, args=(ring, condition, control), daemon=True).start()
+
+    print(f"Web server process {worker_id} serving on port {port}")
+    web_server.start_server(host=host, port=port, sockets=[listen_socket])
+
+class WebProcessBridge:
+    """
+    Runs the web server in separate processes and feeds them through a FrameRing.
+
+    Offers the same functions DisplayWindow uses on the web_server module, so it
+    can stand in for it. Encoded frames travel through shared memory only; the
+    small status and keyframe messages coming back use a multiprocessing queue.
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8181, workers: int = 1,
+                 slots: int = DEFAULT_SLOTS, slot_size: int = DEFAULT_SLOT_SIZE):
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.slots = slots
+        self.slot_size = slot_size
+        self.ring = None
+        self.processes = []
+        self.client_connected_callback = None
+        self.connections_changed_callback = None
+        self.state_requested_callback = None
+        # Forking a process that runs Qt threads is unsafe, always start clean interpreters
+        self._context = multiprocessing.get_context("spawn")
+        self._condition = None
+        self._control = None
+        self._publish_lock = threading.Lock()
+        self._status: Dict[int, tuple] = {}
+
+    def start(self):
+        """Create the ring and start the worker processes"""
+        self.ring = FrameRing(slots=self.slots, slot_size=self.slot_size, create=True)
+        self._condition = self._context.Condition()
+        self._control = self._context.Queue()
+
+        # Workers share one listening socket so they can all accept on the same port
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listen_socket.bind((self.host, self.port))
+        listen_socket.set_inheritable(True)
+
+        for worker_id in range(self.workers):
+            process = self._context.Process(
+                target=run_web_worker,
+                args=(worker_id, self.ring.name, self.slots, self.slot_size,
+                      self._condition, self._control, listen_socket, self.host, self.port),
+                daemon=True,
+                name=f"stagedeck-web-{worker_id}",
+            )
+            process.start()
+            self.processes.append(process)
+        listen_socket.close()
+
+        threading.Thread(target=self._control_loop, daemon=True).start()
+        print(f"Started {self.workers} web server process(es) on port {self.port}")
+
+    def is_alive(self) -> bool:
+        return any(process.is_alive() for process in self.processes)
+
+    def stop(self):
+        """Terminate the workers and release the shared memory"""
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(timeout=2)
+        self.processes = []
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
+
+    def _control_loop(self):
+        while True:
+            try:
+                message = self._control.get()
+            except (EOFError, OSError):
+                return
+            if message[0] == "status":
+                _, worker_id, has_clients, has_state_clients, renditions = message
+                self._status[worker_id] = (has_clients, has_state_clients, renditions)
+                if self.connections_changed_callback is not None:
+                    self.connections_changed_callback()
+            elif message[0] == "keyframe" and self.client_connected_callback is not None:
+                self.client_connected_callback(message[1])
+            elif message[0] == "state" and self.state_requested_callback is not None:
+                self.state_requested_callback()
+
+    # web_server module interface
+
+    def set_client_connected_callback(self, callback):
+        self.client_connected_callback = callback
+
+    def set_connections_changed_callback(self, callback):
+        self.connections_changed_callback = callback
+
+    def set_state_requested_callback(self, callback):
+        self.state_requested_callback = callback
+
+    def has_clients(self) -> bool:
+        return any(status[0] for status in list(self._status.values()))
+
+    def has_state_clients(self) -> bool:
+        return any(status[1] for status in list(self._status.values()))
+
+    def active_renditions(self) -> Dict[Tuple[int, int], bool]:
+        renditions = {}
+        for status in list(self._status.values()):
+            for rendition, allow_delta in status[2].items():
+                renditions[rendition] = renditions.get(rendition, True) and allow_delta
+        return renditions
+
+    def _publish(self, kind: int, rendition: Tuple[int, int], payload: bytes):
+        if self.ring is None:
+            return
+        with self._publish_lock:
+            self.ring.publish(kind, rendition, payload)
+        with self._condition:
+            self._condition.notify_all()
+
+    def broadcast_frame(self, image_data: bytes, width: int = 0, height: int = 0,
+                        rendition: Tuple[int, int] = web_server.DEFAULT_RENDITION):
+        frame = web_server.StreamFrame(image_data, width, height, next(web_server.frame_sequence),
+                                       time.time() * 1000.0, rendition=rendition)
+        self._publish(RECORD_FRAME, rendition, frame.to_binary())
+
+    def broadcast_delta(self, tiles, width: int, height: int,
+                        rendition: Tuple[int, int] = web_server.DEFAULT_RENDITION):
+        frame = web_server.StreamFrame(None, width, height, next(web_server.frame_sequence),
+                                       time.time() * 1000.0, tiles=tiles, rendition=rendition)
+        self._publish(RECORD_FRAME, rendition, frame.to_binary())
+
+    def publish_state(self, state: dict):
+        self._publish(RECORD_STATE, web_server.DEFAULT_RENDITION, json.dumps(state).encode("utf-8"))
@@ -0,0 +1,166 @@
+import math
+from collections import deque
+
+PHASE_LOCK_GAIN = 0.05  # Share of the measured phase error corrected per frame
+CLOCK_DRIFT = 0.00001  # Seconds per frame the source clock offset may grow by
+DISCONTINUITY = 1.0  # Timestamp jumps larger than this (seconds) restart the timing
+
+class QueuedFrame:
+    """A received frame waiting for its presentation time"""
+    __slots__ = ('pts', 'frame', 'captured', 'timestamp')
+
+    def __init__(self, pts, frame, captured, timestamp):
+        self.pts = pts  # Local presentation time (time.monotonic)
+        self.frame = frame
+        self.captured = captured
+        self.timestamp = timestamp  # Source time in seconds
+
+class FramePacer:
+    """
+    Decides which video frame is shown at each output tick.
+
+    Frames are placed on the local clock by their source timestamps and shown
+    `delay_frames` frame intervals after they are due, which absorbs arrival
+    jitter. Output ticks run at the source frame rate, phase locked half a frame
+    after the presentation times so timer jitter never changes which frame is
+    picked, or at a fixed output rate. Each tick shows the newest frame that is
+    due; frames skipped over count as dropped, ticks without a new frame as
+    duplicated.
+    """
+
+    def __init__(self, delay_frames=1.0, max_queued=3):
+        """
+        Initialize the pacer.
+
+        Args:
+            delay_frames (float): Frame intervals between a frame's timestamp and showing it
+            max_queued (int): Frames kept waiting before the oldest is dropped
+        """
+        self.delay_frames = delay_frames
+        self.max_queued = max_queued
+        self.reset()
+
+    def reset(self):
+        """Forget the queue and timing, e.g. when the source changes"""
+        self.queue = deque()
+        self.interval = None  # Seconds between output ticks
+        self.source_interval = None
+        self.locked = False  # Ticks follow the source cadence
+        self.next_tick = None
+        self.last_push = None
+        self._offset = None  # Local clock minus source clock
+        self._last_shown = None  # (tick time, source timestamp)
+
+        # Counters
+        self.ticks = 0
+        self.frames_shown = 0
+        self.frames_duplicated = 0
+        self.frames_dropped = 0
+        self.judder_ms = 0.0  # RMS deviation of shown frame spacing from source spacing, smoothed
+
+    def push(self, frame, captured, timestamp=None, source_fps=0.0, output_fps=0.0):
+        """
+        Queue a received frame.
+
+        Args:
+            frame: The frame (any object, handed back by tick())
+            captured (float): time.monotonic() when the frame was received
+            timestamp (float): Source time of the frame in seconds (None = use captured)
+            source_fps (float): Nominal source frame rate (0 = unknown)
+            output_fps (float): Output tick rate (0 = follow the source)
+        """
+        source_interval = 1.0 / source_fps if source_fps > 0 else None
+        interval = 1.0 / output_fps if output_fps > 0 else source_interval
+        if interval is None:
+            raise ValueError("Pacing needs a source or an output frame rate")
+        if interval != self.interval or source_interval != self.source_interval:
+            self.interval = interval
+            self.source_interval = source_interval
+            self.locked = output_fps <= 0
+            self.next_tick = None
+
+        if timestamp is None:
+            timestamp = captured
+        offset = captured - timestamp
+        if self._offset is None or abs(offset - self._offset) > DISCONTINUITY:
+            # First frame, or the source restarted or looped
+            self._offset = offset
+            self._last_shown = None
+        else:
+            # Follow the fastest arrival, slowly allowing for clock drift
+            self._offset = min(self._offset + CLOCK_DRIFT, offset)
+        pts = timestamp + self._offset + self.delay_frames * (source_interval or interval)
+
+        self.queue.append(QueuedFrame(pts, frame, captured, timestamp))
+        while len(self.queue) > self.max_queued:
+            self.queue.popleft()
+            self.frames_dropped += 1
+        self.last_push = captured
+
+        # Ticks sit half a frame after the presentation times
+        tick = pts + self.interval / 2
+        if self.next_tick is None:
+            self.next_tick = tick
+        elif self.locked:
+            error = (tick - self.next_tick + self.interval / 2) % self.interval - self.interval / 2
+            self.next_tick += error * PHASE_LOCK_GAIN
+
+    def tick(self):
+        """
+        Run the output tick scheduled at next_tick and schedule the following one.
+
+        Returns:
+            (frame, captured) of the frame to show now, or None to keep the current one
+        """
+        tick_time = self.next_tick
+        self.ticks += 1
+        selected = None
+        while self.queue and self.queue[0].pts <= tick_time:
+            if selected is not None:
+                self.frames_dropped += 1
+            selected = self.queue.popleft()
+
+        if selected is not None:
+            self.frames_shown += 1
+            if self._last_shown is not None:
+                last_tick, last_timestamp = self._last_shown
+                deviation = (tick_time - last_tick) - (selected.timestamp - last_timestamp)
+                squared = (deviation * 1000.0) ** 2
+                self.judder_ms = math.sqrt(self.judder_ms ** 2 * 0.95 + squared * 0.05)
+            self._last_shown = (tick_time, selected.timestamp)
+        elif self._last_shown is not None and self.is_running(tick_time):
+            self.frames_duplicated += 1
+
+        self.next_tick += self.interval
+        return None if selected is None else (selected.frame, selected.captured)
+
+    def catch_up(self, now):
+        """Skip ticks that were missed (e.g. the event loop was blocked) without showing them"""
+        if self.next_tick is not None and self.next_tick < now - self.interval:
+            self.next_tick += math.ceil((now - self.next_tick) / self.interval - 1) * self.interval
+
+    def is_running(self, now):
+        """Whether frames are still arriving (ticks are needed)"""
+        if self.queue:
+            return True
+        if self.last_push is None:
+            return False
+        # Short, so unchanged frames skipped by the source don't count as duplicates for long
+        return now - self.last_push < 4 * (self.source_interval or self.interval)
+
+    def decimation(self, min_interval):
+        """Show every n-th tick's frame so that at least min_interval seconds pass between them"""
+        if not self.interval:
+            return 1
+        return max(1, math.ceil(min_interval / self.interval - 0.05))
+
+    def stats(self):
+        return {
+            'output_fps': round(1.0 / self.interval, 2) if self.interval else 0.0,
+            'locked': self.locked,
+            'shown': self.frames_shown,
+            'duplicated': self.frames_duplicated,
+            'dropped': self.frames_dropped,
+            'judder_ms': round(self.judder_ms, 2),
+            'queued': len(self.queue),
+        }
@@ -1,11 +1,11 @@
 import sys
 import json
 import time
-import ctypes
-from pathlib import Path
 from pythonosc.dispatcher import Dispatcher
 from pythonosc.osc_server import BlockingOSCUDPServer
 import threading
+import multiprocessing
+from collections import OrderedDict
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
@@ -17,6 +17,10 @@ from io import BytesIO
 import pygame.mixer
 import os
 from osc_client import OSCClient
+from stream_encoder import StreamEncoder
+from video_sources import NDIReceiver, NDIlib_recv_color_format, open_video_source
+from frame_pacer import FramePacer
+from concurrent.futures import ThreadPoolExecutor
 
 def get_resource_path(relative_path):
     """Get absolute path to resource for both dev and PyInstaller"""
@@ -32,20 +36,48 @@ def get_resource_path(relative_path):
         base_path = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(base_path, relative_path)
 
+BORDER_COLOR = QColor("white")
+
 class TextItem:
+    __slots__ = ('text', 'font_family', 'font_size', 'font_color', 'version')
+    
     def __init__(self, text="", font_family="Arial", font_size=20, font_color="white"):
         self.text = text
         self.font_family = font_family
         self.font_size = font_size
         self.font_color = font_color
+        
+    def __setattr__(self, name, value):
+        # Every property change bumps the version, so fields know when to rebuild their text layout
+        object.__setattr__(self, name, value)
+        if name != 'version':
+            object.__setattr__(self, 'version', getattr(self, 'version', 0) + 1)
+        
+    def to_dict(self):
+        """Plain description for the field model stream"""
+        return {
+            'text': self.text,
+            'font_family': self.font_family,
+            'font_size': self.font_size,
+            'font_color': self.font_color,
+        }
+
+class Field:
+    """
+    One text field on the display.
 
-class Field(QWidget):
-    def __init__(self, parent=None, field_id="", x=0, y=0, width=200, height=200,
+    Fields are plain records drawn by the display window's compositor, not widgets,
+    so hundreds of them stay cheap. The geometry methods mirror QWidget's so callers
+    don't need to care.
+    """
+    __slots__ = ('display', 'field_id', 'show_border', 'title', 'content', '_x', '_y', '_width', '_height',
+                 '_visible', '_layout', '_layout_version', 'layouts_built', 'paint_count')
+    
+    def __init__(self, display=None, field_id="", x=0, y=0, width=200, height=200,
                  title_text="", title_font_family="Arial", title_font_size=20, title_font_color="white",
                  content_font_family="Arial", content_font_size=20, content_font_color="white",
                  show_border=True):
-        super().__init__(parent)
-        
+        self.display = display  # Notified of changes through invalidate_frame()
         self.field_id = field_id
         self.show_border = show_border
         
@@ -53,17 +85,76 @@ class Field(QWidget):
         self.title = TextItem(title_text, title_font_family, title_font_size, title_font_color)
         self.content = TextItem("", content_font_family, content_font_size, content_font_color)
         
-        # Set size and position
-        self.setFixedSize(width, height)
-        self.move(x, y)  # Use absolute coordinates from top-left
+        # Position and size, using absolute coordinates from top-left
+        self._x = x
+        self._y = y
+        self._width = width
+        self._height = height
+        self._visible = True
+        
+        # Text layout, rebuilt when the title, content or size change
+        self._layout = None
+        self._layout_version = None
+        self.layouts_built = 0
+        self.paint_count = 0  # Times the field was composited into the display frame
+        
+    def x(self):
+        return self._x
+        
+    def y(self):
+        return self._y
+        
+    def width(self):
+        return self._width
+        
+    def height(self):
+        return self._height
+        
+    def pos(self):
+        return QPoint(self._x, self._y)
         
-        # Store position
+    def size(self):
+        return QSize(self._width, self._height)
+        
+    def geometry(self):
+        return QRect(self._x, self._y, self._width, self._height)
+        
+    def move(self, x, y):
+        old = self.geometry()
         self._x = x
         self._y = y
+        # Both the uncovered and the newly covered area change
+        self._invalidate_display(old.united(self.geometry()))
         
-        # Transparency
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setAutoFillBackground(False)
+    def resize(self, width, height):
+        old = self.geometry()
+        self._width = width
+        self._height = height
+        self._invalidate_display(old.united(self.geometry()))
+        
+    def isVisible(self):
+        return self._visible
+        
+    def isHidden(self):
+        return not self._visible
+        
+    def setVisible(self, visible):
+        self._visible = bool(visible)
+        self._invalidate_display(self.geometry())
+        
+    def show(self):
+        self.setVisible(True)
+        
+    def hide(self):
+        self.setVisible(False)
+        
+    def update(self):
+        """Redraw the field after its text, fonts, colors or border changed"""
+        self._invalidate_display(self.geometry())
+        
+    def _invalidate_display(self, rect):
+        if self.display is not None:
+            self.display.invalidate_frame(rect)
         
     def get_x(self):
         """Get x position"""
@@ -75,53 +166,148 @@ class Field(QWidget):
         
     def set_position(self, x, y):
         """Set position"""
-        self._x = x
-        self._y = y
         self.move(x, y)
         
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def _layout_key(self):
+        return (self.title.version, self.content.version, self.width(), self.height())
         
-        # Draw border if enabled
-        if self.show_border:
-            painter.setPen(QColor("white"))
-            painter.drawRect(0, 0, self.width() - 1, self.height() - 1)
+    def _build_layout(self):
+        """Measure and prepare the title and content text for drawing"""
+        width = self.width()
+        runs = []
         
-        # Set up font for title
+        # Title centered at top
         title_font = QFont(self.title.font_family, self.title.font_size)
-        painter.setFont(title_font)
-        
-        # Calculate title metrics
-        title_metrics = painter.fontMetrics()
-        
-        # Draw title centered at top
-        painter.setPen(QColor(self.title.font_color))
+        title_height = QFontMetrics(title_font).height()
         title_y = 10  # Small padding from top
-        painter.drawText(0, title_y, self.width(), title_metrics.height(), Qt.AlignCenter, self.title.text)
+        runs.append(self._layout_run(title_font, self.title.font_color, [self.title.text], title_y,
+                                     title_height, width))
         
-        # Set up font for content
+        # Content centered in remaining space
         content_font = QFont(self.content.font_family, self.content.font_size)
-        painter.setFont(content_font)
-        
-        # Calculate content metrics
-        content_metrics = painter.fontMetrics()
-        content_height = content_metrics.height()
-        
-        # Draw content centered in remaining space
-        painter.setPen(QColor(self.content.font_color))
-        content_y = title_y + title_metrics.height() + 10  # Below title with padding
+        content_height = QFontMetrics(content_font).height()
+        content_y = title_y + title_height + 10  # Below title with padding
         remaining_height = self.height() - content_y - 10  # Leave padding at bottom
-        
-        # Split content into lines and center each line
         lines = self.content.text.split('\n')
         total_lines_height = len(lines) * content_height
         current_y = content_y + (remaining_height - total_lines_height) // 2  # Vertical center
+        runs.append(self._layout_run(content_font, self.content.font_color, lines, current_y,
+                                     content_height, width))
+        
+        self._layout = runs
+        self._layout_version = self._layout_key()
+        self.layouts_built += 1
         
+    @staticmethod
+    def _layout_run(font, color, lines, top, line_height, width):
+        """Prepare lines of one font, each centered in a (width x line_height) row"""
+        items = []
         for line in lines:
-            painter.drawText(0, current_y, self.width(), content_height, Qt.AlignCenter, line)
-            current_y += content_height
+            text = QStaticText(line)
+            text.setTextFormat(Qt.PlainText)
+            text.setPerformanceHint(QStaticText.AggressiveCaching)
+            text.prepare(QTransform(), font)
+            size = text.size()
+            position = QPointF((width - size.width()) / 2, top + (line_height - size.height()) / 2)
+            items.append((position, text))
+            top += line_height
+        return font, QColor(color), items
+        
+    def raster_key(self):
+        """Changes whenever the field looks different"""
+        return self._layout_key() + (self.show_border,)
+        
+    def draw(self, painter):
+        """Draw the field with its top-left corner at the painter origin"""
+        if self._layout_version != self._layout_key():
+            self._build_layout()
+            
+        # Draw border if enabled
+        if self.show_border:
+            painter.setPen(BORDER_COLOR)
+            painter.drawRect(0, 0, self.width() - 1, self.height() - 1)
+        
+        for font, color, items in self._layout:
+            painter.setFont(font)
+            painter.setPen(color)
+            for position, text in items:
+                painter.drawStaticText(position, text)
+
+class FieldRasterCache:
+    """
+    Keeps a rendered image of every field until its text, fonts, colors, border or size change.
+
+    Images are evicted least recently used first once the cache holds more than
+    `max_bytes`. Fields that alone would exceed the budget are not cached.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # Field -> (raster key, QImage)
+        self.bytes_used = 0
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def get(self, field):
+        """Return the field as an image, or None if it is too large to cache"""
+        key = field.raster_key()
+        entry = self.entries.get(field)
+        if entry is not None and entry[0] == key:
+            self.entries.move_to_end(field)
+            self.hits += 1
+            return entry[1]
+            
+        self.misses += 1
+        self.discard(field)
+        size = field.width() * field.height() * 4
+        if size > self.max_bytes or size == 0:
+            return None
+            
+        image = QImage(field.width(), field.height(), QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        field.draw(painter)
+        painter.end()
+        
+        self.entries[field] = (key, image)
+        self.bytes_used += image.sizeInBytes()
+        while self.bytes_used > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes_used -= evicted.sizeInBytes()
+            self.evictions += 1
+        return image
+        
+    def discard(self, field):
+        """Forget the image of a field"""
+        entry = self.entries.pop(field, None)
+        if entry is not None:
+            self.bytes_used -= entry[1].sizeInBytes()
+            
+    def stats(self):
+        return {
+            'fields': len(self.entries),
+            'bytes': self.bytes_used,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
 
 class DisplayWindow(QMainWindow):
+    # Emitted whenever the streamed picture may have changed (safe from any thread)
+    stream_invalidated = pyqtSignal()
+    # Emitted by the NDI scaling thread with (frame id, scaled QImage)
+    ndi_frame_scaled = pyqtSignal(int, object)
+    # Emitted by the NDI capture thread when a new frame is waiting
+    ndi_frame_ready = pyqtSignal()
+    # Emitted by the NDI discovery thread with (added source names, removed source names)
+    ndi_sources_changed = pyqtSignal(list, list)
+    # Emitted by the web server when a field model viewer is waiting for the model (safe from any thread)
+    stream_state_requested = pyqtSignal()
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("StageDeck Beta")
@@ -139,6 +325,26 @@ class DisplayWindow(QMainWindow):
         self.original_ndi_size = None
         self.ndi_enabled = False
         self.ndi_receiver = NDIReceiver()
+        self.video_source = None  # VideoSource shown as background (the NDI receiver when NDI is enabled)
+        
+        # Scaled NDI frame, cached as (frame id, size, QImage, capture time) and scaled off the GUI thread
+        self.ndi_frame_id = 0
+        self.ndi_frame_time = None  # When the current frame was captured
+        self._painted_ndi_id = 0
+        self.ndi_fast_scaling = False  # Trade scaling quality for speed
+        self.ndi_frames_scaled = 0
+        self._scaled_ndi = None
+        self._ndi_scaler = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ndi-scaler")
+        self._ndi_scaling = False
+        self.ndi_frame_scaled.connect(self._on_ndi_frame_scaled)
+        
+        # Composited frame shared by paintEvent and the web stream
+        self._frame = None
+        self._dirty_region = QRegion()
+        self._dirty_all = True
+        self._dirty_lock = threading.Lock()  # Fields may be changed from the OSC thread
+        self.frames_composited = 0
+        self.field_cache = FieldRasterCache()
         
         # Border
         self.border_width = 2
@@ -152,22 +358,46 @@ class DisplayWindow(QMainWindow):
         self.central_widget.setStyleSheet("background: transparent;")
         self.setCentralWidget(self.central_widget)
         
-        # Setup NDI timer
-        self.ndi_timer = QTimer()
-        self.ndi_timer.timeout.connect(self.update_ndi)
-        self.ndi_timer.setInterval(33)  # ~30fps
+        # NDI frames are captured on the receiver's thread and picked up here
+        self.ndi_frame_ready.connect(self.update_ndi)
+        
+        # Frame pacing: video frames are shown (and streamed) on ticks locked to the
+        # source frame rate, or to output_fps when set, instead of whenever they arrive
+        self.pacing_enabled = True
+        self.output_fps = 0.0  # 0 follows the source
+        self.frame_pacer = FramePacer()
+        self.pacer_timer = QTimer()
+        self.pacer_timer.setSingleShot(True)
+        self.pacer_timer.setTimerType(Qt.PreciseTimer)
+        self.pacer_timer.timeout.connect(self._on_pacer_tick)
+        self._stream_after_scaling = False
         
         # Store screen info
         self.current_screen = 0
         self.normal_geometry = None
         
         # Setup web streaming
+        # Frames are only captured after something changed, at most once per stream_min_interval_ms
         self.web_enabled = False
+        self.stream_min_interval_ms = 33  # ~30fps cap
+        self.stream_keepalive_ms = 2000  # Resend an unchanged frame as a keyframe this often (0 disables)
+        self._stream_dirty = True
+        self._last_stream_capture = 0.0
         self.web_timer = QTimer()
+        self.web_timer.setSingleShot(True)
         self.web_timer.timeout.connect(self.broadcast_frame)
-        self.web_timer.setInterval(33)  # ~30fps
+        self.keepalive_timer = QTimer()
+        self.keepalive_timer.timeout.connect(self._stream_keepalive)
+        self.stream_invalidated.connect(self._schedule_stream_frame)
+        self.stream_state_requested.connect(self.publish_stream_state)
         self.server_thread = None
         self.web_server = None
+        self.web_port = 8181  # Used when there is no control panel to read the port from
+        self.web_process_workers = 0  # Web server processes fed through shared memory (0 = in-process thread)
+        self.web_bridge = None
+        
+        # JPEG encoding runs on a worker pool so the GUI thread only snapshots frames
+        self.stream_encoder = StreamEncoder(self._publish_encoded_frame, workers=2, max_in_flight=2)
         
         # Import web server module
         try:
@@ -181,6 +411,10 @@ class DisplayWindow(QMainWindow):
             sys.modules["web_server"] = web_server
             spec.loader.exec_module(web_server)
             self.web_server = web_server
+            # New viewers need a frame right away instead of waiting for the next change
+            self.web_server.set_client_connected_callback(self._on_stream_client_connected)
+            self.web_server.set_connections_changed_callback(self._on_stream_connections_changed)
+            self.web_server.set_state_requested_callback(self.stream_state_requested.emit)
             print("Web server module loaded successfully")
         except Exception as e:
             print(f"Error loading web server module: {e}")
@@ -190,87 +424,143 @@ class DisplayWindow(QMainWindow):
         self.update_background()
 
     def update_ndi(self):
-        """Update NDI frame from receiver"""
-        if self.ndi_enabled and self.ndi_receiver:
-            frame = self.ndi_receiver.receive_frame()
-            if frame is not None:
-                self._update_ndi_frame(frame)
+        """Take the newest frame captured by the video source"""
+        if self.video_source is not None:
+            latest = self.video_source.take_frame()
+            if latest is not None:
+                frame, captured, timestamp = latest
+                source_fps = self.video_source.frame_rate
+                if self.pacing_enabled and (source_fps > 0 or self.output_fps > 0):
+                    # Shown by the pacer when it is due
+                    self.frame_pacer.push(frame, captured, timestamp, source_fps, self.output_fps)
+                    if not self.pacer_timer.isActive():
+                        self._schedule_pacer_tick()
+                else:
+                    self.ndi_frame_time = captured
+                    self._update_ndi_frame(frame)
+                    
+    def _schedule_pacer_tick(self):
+        delay = self.frame_pacer.next_tick - time.monotonic()
+        self.pacer_timer.start(max(0, int(round(delay * 1000.0))))
+        
+    def is_pacing(self):
+        """Whether background video is currently shown on pacer ticks"""
+        return self.frame_pacer.is_running(time.monotonic())
+        
+    def _on_pacer_tick(self):
+        """Show the frame the pacer picked for this tick and stream on every n-th tick"""
+        now = time.monotonic()
+        self.frame_pacer.catch_up(now)
+        stream_tick = self.frame_pacer.ticks % self.frame_pacer.decimation(self.stream_min_interval_ms / 1000.0) == 0
+        selected = self.frame_pacer.tick()
+        if selected is not None:
+            frame, self.ndi_frame_time = selected
+            self._update_ndi_frame(frame)
+            # Stream the frame once it is scaled into the picture
+            self._stream_after_scaling = stream_tick
+        elif stream_tick and self._stream_dirty:
+            self.broadcast_frame()
+            
+        if self.frame_pacer.is_running(now):
+            self._schedule_pacer_tick()
             
     def set_ndi_enabled(self, enabled):
         """Enable or disable NDI reception"""
-        self.ndi_enabled = enabled
-        if enabled:
-            if not self.ndi_enabled:
-                if self.ndi_receiver.initialize():
-                    self.ndi_enabled = True
-                    self.ndi_timer.start()
-                    print("NDI initialized, searching for sources...")
-                    return True
-                return False
-        else:
-            self.ndi_enabled = False
-            self.ndi_timer.stop()
-            self.ndi_frame = None
-            self.update()
-        return True
+        return self.enable_ndi(enabled)
         
     def _update_ndi_frame(self, frame):
         """Update NDI frame while preserving aspect ratio"""
         if frame is not None:
+            first_frame = self.ndi_frame is None
             self.ndi_frame = frame
+            self.ndi_frame_id += 1
             if self.original_ndi_size is None:
                 self.original_ndi_size = (frame.width(), frame.height())
-            self.update()
+            if first_frame:
+                self.update()
+            else:
+                # The video area is invalidated once the scaled frame is ready
+                self._schedule_ndi_scaling()
+                
+    def _schedule_ndi_scaling(self):
+        """Scale the current NDI frame on the scaling thread, unless it is busy"""
+        if self._ndi_scaling or self.ndi_frame is None:
+            return
+        self._ndi_scaling = True
+        try:
+            self._ndi_scaler.submit(self._scale_ndi_frame, self.ndi_frame_id, self.ndi_frame,
+                                    self.get_ndi_rect().size(), self.ndi_fast_scaling, self.ndi_frame_time)
+        except RuntimeError:
+            # Scaler was shut down
+            self._ndi_scaling = False
+            
+    def _scale_ndi_frame(self, frame_id, frame, size, fast, captured):
+        try:
+            self.ndi_frame_scaled.emit(frame_id, (self.scale_ndi_image(frame, size, fast), captured))
+        except Exception as e:
+            print(f"Error scaling NDI frame: {e}")
+            self.ndi_frame_scaled.emit(frame_id, None)
+            
+    def _on_ndi_frame_scaled(self, frame_id, result):
+        """Take over a frame scaled by the scaling thread (GUI thread)"""
+        self._ndi_scaling = False
+        if result is not None and self.ndi_frame is not None:
+            image, captured = result
+            self._scaled_ndi = (frame_id, image.size(), image, captured)
+            self.ndi_frames_scaled += 1
+            self.invalidate_frame(self.get_ndi_rect())
+            if self._stream_after_scaling:
+                self._stream_after_scaling = False
+                self.broadcast_frame()
+        if self.ndi_frame is not None and frame_id != self.ndi_frame_id:
+            # Frames arrived meanwhile, only the newest one is scaled
+            self._schedule_ndi_scaling()
+        
+    @staticmethod
+    def scale_ndi_image(frame, size, fast=False):
+        """Scale an NDI frame to the given size, skipping the work when it already fits"""
+        if frame.size() == size:
+            return frame
+        mode = Qt.FastTransformation if fast else Qt.SmoothTransformation
+        # The size already has the frame's aspect ratio, hitting it exactly keeps the cache key stable
+        return frame.scaled(size, Qt.IgnoreAspectRatio, mode)
+        
+    def get_ndi_rect(self):
+        """Area the scaled NDI frame covers, centered in the window"""
+        if self.original_ndi_size is None:
+            return QRect()
+        scale = min(self.width() / self.original_ndi_size[0], self.height() / self.original_ndi_size[1])
+        width = int(self.original_ndi_size[0] * scale)
+        height = int(self.original_ndi_size[1] * scale)
+        return QRect((self.width() - width) // 2, (self.height() - height) // 2, width, height)
         
     def get_scaled_ndi_frame(self):
-        """Calculate scaled NDI frame dimensions maintaining aspect ratio"""
+        """
+        Return the NDI frame scaled to the window, maintaining aspect ratio.
+
+        Frames are scaled once per frame and window size. While the scaling thread
+        works on a new frame, the previous scaled frame is returned.
+        """
         if self.ndi_frame is None or self.original_ndi_size is None:
             return None, (0, 0)
             
-        window_width = self.width()
-        window_height = self.height()
-        
-        # Calculate scaling factors for both dimensions
-        scale_x = window_width / self.original_ndi_size[0]
-        scale_y = window_height / self.original_ndi_size[1]
+        size = self.get_ndi_rect().size()
+        cached = self._scaled_ndi
+        if cached is None or cached[1] != size or (cached[0] != self.ndi_frame_id and not self._ndi_scaling):
+            # Window was resized or nothing is on its way, scale right here
+            scaled_frame = self.scale_ndi_image(self.ndi_frame, size, self.ndi_fast_scaling)
+            cached = (self.ndi_frame_id, scaled_frame.size(), scaled_frame, self.ndi_frame_time)
+            self._scaled_ndi = cached
+            self.ndi_frames_scaled += 1
         
-        # Use the smaller scaling factor to maintain aspect ratio
-        scale = min(scale_x, scale_y)
-        
-        # Calculate new dimensions
-        new_width = int(self.original_ndi_size[0] * scale)
-        new_height = int(self.original_ndi_size[1] * scale)
-        
-        # Scale the frame
-        scaled_frame = self.ndi_frame.scaled(new_width, new_height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        
-        return scaled_frame, (new_width, new_height)
+        return cached[2], (size.width(), size.height())
         
     def paintEvent(self, event):
+        # Show the composited frame; plain repaints (expose, move) reuse it as is
         painter = QPainter(self)
-        
-        # Fill background
-        painter.fillRect(0, 0, self.width(), self.height(), self._background_color)
-        
-        # Draw NDI frame if available
-        if self.ndi_frame is not None:
-            scaled_frame, (width, height) = self.get_scaled_ndi_frame()
-            if scaled_frame is not None:
-                # Calculate position to center the frame
-                x = (self.width() - width) // 2
-                y = (self.height() - height) // 2
-                
-                # Draw the frame
-                painter.drawImage(x, y, scaled_frame)
-        
-        # Draw border if transparent
-        if self._background_color.alpha() < 255:
-            painter.setPen(QColor("white"))
-            painter.drawRect(0, 0, self.width() - 1, self.height() - 1)
-
-        # Draw fields on top
-        for field in self.fields.values():
-            field.update()
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.setClipRegion(event.region())
+        painter.drawImage(event.rect(), self.compose_frame(), event.rect())
             
     def set_background_color(self, color):
         """Set window background color"""
@@ -389,52 +679,96 @@ class DisplayWindow(QMainWindow):
             if not self.ndi_enabled:
                 if self.ndi_receiver.initialize():
                     self.ndi_enabled = True
-                    self.ndi_timer.start()
+                    self.set_video_source(self.ndi_receiver)
+                    self.ndi_receiver.start_discovery(self.ndi_sources_changed.emit)
                     print("NDI initialized, searching for sources...")
                     return True
                 return False
         else:
             self.ndi_enabled = False
-            self.ndi_timer.stop()
-            self.ndi_frame = None
-            self.update()
+            self.ndi_receiver.stop_discovery()
+            if self.video_source is self.ndi_receiver:
+                self.set_video_source(None)
         return True
         
+    def set_video_source(self, source):
+        """
+        Show frames of a video source as the background.
+
+        Args:
+            source (VideoSource): Opened source, or None for no background video
+        """
+        if source is self.video_source:
+            return
+        if self.video_source is not None:
+            self.video_source.stop_capture()
+        self.video_source = source
+        self.ndi_frame = None
+        self._scaled_ndi = None
+        self.pacer_timer.stop()
+        self.frame_pacer.reset()
+        if source is not None:
+            source.set_display_size(self.width(), self.height())
+            source.start_capture(self.ndi_frame_ready.emit)
+        self.update()
+        
+    def set_ndi_fast_scaling(self, fast):
+        """Use fast instead of smooth scaling for the NDI background"""
+        self.ndi_fast_scaling = fast
+        self._scaled_ndi = None
+        self.update()
+        
+    def set_ndi_uyvy(self, uyvy):
+        """Receive NDI video as UYVY (half the bandwidth of BGRA, no alpha)"""
+        self.ndi_receiver.set_color_format(NDIlib_recv_color_format.UYVY_BGRA if uyvy
+                                           else NDIlib_recv_color_format.BGRX_BGRA)
+        
     def get_ndi_sources(self):
         if self.ndi_enabled:
             return self.ndi_receiver.find_sources()
         return []
         
-    def connect_to_ndi_source(self, index):
+    def connect_to_ndi_source(self, source):
+        """Connect to an NDI source by name (or index in the discovered list)"""
         if self.ndi_enabled:
-            return self.ndi_receiver.connect_to_source(index)
+            return self.ndi_receiver.connect_to_source(source)
         return False
         
     def add_field(self, field_id, x, y, width, height, title_text="", 
                   title_font_family="Arial", title_font_size=20, title_font_color="white",
                   content_font_family="Arial", content_font_size=20, content_font_color="white",
                   show_border=True):
-        # Remove existing field if it exists
-        if field_id in self.fields:
-            old_field = self.fields[field_id]
-            old_field.deleteLater()
+        field = self.fields.get(field_id)
+        if field is not None:
+            # Edit the existing field in place, its content stays
+            field.move(x, y)
+            field.resize(width, height)
+            field.title.text = title_text
+            field.title.font_family = title_font_family
+            field.title.font_size = title_font_size
+            field.title.font_color = title_font_color
+            field.content.font_family = content_font_family
+            field.content.font_size = content_font_size
+            field.content.font_color = content_font_color
+            field.show_border = show_border
+            field.update()
+            return field
             
         # Create new field
         field = Field(self, field_id, x, y, width, height, title_text, title_font_family, title_font_size, title_font_color, content_font_family, content_font_size, content_font_color, show_border)
         self.fields[field_id] = field
-        field.show()
+        field.update()
         
         # Send fields list to Companion if OSC client is enabled
         if hasattr(self, 'osc_client_enabled') and self.osc_client_enabled:
             self.osc_client.send_fields_list(self.fields)
-            
-        # Force a repaint to clear any artifacts
-        self.update()
+        return field
         
     def remove_field(self, field_id):
         if field_id in self.fields:
-            self.fields[field_id].deleteLater()
-            del self.fields[field_id]
+            field = self.fields.pop(field_id)
+            self.field_cache.discard(field)
+            self.invalidate_frame(field.geometry())
             
             # Send fields list to Companion if OSC client is enabled
             if hasattr(self, 'osc_client_enabled') and self.osc_client_enabled:
@@ -453,356 +787,347 @@ class DisplayWindow(QMainWindow):
         if not self.ndi_enabled:
             self.update()
             
+    def add_osc_field(self, field_id):
+        """Create a field with default settings for an unknown OSC field id"""
+        self.add_field(
+            field_id,
+            x=200, y=10,  # Default position
+            width=300, height=200,  # Default size
+            title_text=field_id,
+            title_font_family="Arial",
+            title_font_size=24,
+            title_font_color="white",
+            content_font_family="Arial",
+            content_font_size=32,
+            content_font_color="white",
+            show_border=True
+        )
+        
+    def apply_field_property(self, field, property_name, value):
+        """Apply one /field/<id>/<property> OSC value to a field"""
+        if property_name == "content":
+            field.content.text = str(value)
+        elif property_name == "title":
+            field.title.text = str(value)
+        elif property_name == "x":
+            field.move(int(value), field.y())
+        elif property_name == "y":
+            field.move(field.x(), int(value))
+        elif property_name == "width":
+            field.resize(int(value), field.height())
+        elif property_name == "height":
+            field.resize(field.width(), int(value))
+        elif property_name == "font_size":
+            field.content.font_size = int(value)
+            field.title.font_size = int(value)
+        elif property_name == "font_color":
+            field.content.font_color = str(value)
+            field.title.font_color = str(value)
+        elif property_name == "show_border":
+            field.show_border = bool(value)
+        
+        # Moves, resizes and field.update() mark only the areas they affect
+        field.update()
+        
+    def apply_config(self, config):
+        """Load background color and fields from a config dict. Returns the loaded field ids."""
+        # Load background color
+        if 'background_color' in config:
+            self.set_background_color(config['background_color'])
+            
+        # Load fields
+        field_ids = []
+        for field_id, field_data in config.get('fields', {}).items():
+            self.add_field(
+                field_id,
+                field_data['x'],
+                field_data['y'],
+                field_data['width'],
+                field_data['height'],
+                field_data.get('title_text', ''),
+                field_data.get('title_font_family', 'Arial'),
+                field_data.get('title_font_size', 20),
+                field_data.get('title_font_color', 'white'),
+                field_data.get('content_font_family', 'Arial'),
+                field_data.get('content_font_size', 20),
+                field_data.get('content_font_color', 'white'),
+                field_data.get('show_border', True)
+            )
+            field_ids.append(field_id)
+        return field_ids
+            
     def enable_web_streaming(self, enabled: bool):
         """Enable or disable web streaming"""
         self.web_enabled = enabled
         if enabled:
-            # Start web server if not already running
-            if not self.server_thread or not self.server_thread.is_alive():
-                def run_server():
+            # Get port and process count from main window
+            port = self.web_port
+            main_window = QApplication.activeWindow()
+            if hasattr(main_window, 'web_port_input'):
+                port = main_window.web_port_input.value()
+            if hasattr(main_window, 'web_process_input'):
+                self.web_process_workers = main_window.web_process_input.value()
+            
+            if self.web_process_workers > 0:
+                # Serve viewers from separate processes so socket I/O never competes with rendering
+                if self.server_thread and self.server_thread.is_alive():
+                    # Switching from the in-process server, which holds the port
+                    self.stop_web_server()
+                if not self.web_bridge or not self.web_bridge.is_alive():
                     try:
-                        print("Starting web server...")
-                        # Get port from main window
-                        port = 8181  # Default port
-                        main_window = QApplication.activeWindow()
-                        if hasattr(main_window, 'web_port_input'):
-                            port = main_window.web_port_input.value()
-                        
-                        self.web_server.start_server(host="0.0.0.0", port=port)
+                        import frame_bus
+                        self.web_bridge = frame_bus.WebProcessBridge(host="0.0.0.0", port=port,
+                                                                     workers=self.web_process_workers)
+                        self.web_bridge.set_client_connected_callback(self._on_stream_client_connected)
+                        self.web_bridge.set_connections_changed_callback(self._on_stream_connections_changed)
+                        self.web_bridge.set_state_requested_callback(self.stream_state_requested.emit)
+                        self.web_bridge.start()
                     except Exception as e:
-                        print(f"Error starting web server: {e}")
+                        print(f"Error starting web server processes: {e}")
                         import traceback
                         traceback.print_exc()
-                
-                self.server_thread = threading.Thread(target=run_server, daemon=True)
-                self.server_thread.start()
+                        self.web_bridge = None
+            # Start web server if not already running
+            else:
+                if self.web_bridge:
+                    # Switching from the server processes, which hold the port
+                    self.stop_web_server()
+                if self.web_server is not None and (not self.server_thread or not self.server_thread.is_alive()):
+                    def run_server():
+                        try:
+                            print("Starting web server...")
+                            self.web_server.start_server(host="0.0.0.0", port=port)
+                        except Exception as e:
+                            print(f"Error starting web server: {e}")
+                            import traceback
+                            traceback.print_exc()
+                    
+                    self.server_thread = threading.Thread(target=run_server, daemon=True)
+                    self.server_thread.start()
             
             # Start frame broadcasting
-            self.web_timer.start()
+            if self.stream_keepalive_ms > 0:
+                self.keepalive_timer.start(self.stream_keepalive_ms)
+            self.invalidate_stream()
         else:
             # Stop frame broadcasting
             self.web_timer.stop()
+            self.keepalive_timer.stop()
+            self.stop_web_server()
+            
+    def stop_web_server(self):
+        """Stop the web server processes or the in-process server thread, freeing the port"""
+        if self.web_bridge is not None:
+            self.web_bridge.stop()
+            self.web_bridge = None
+        if self.server_thread is not None and self.server_thread.is_alive():
+            self.web_server.stop_server()
+            self.server_thread.join(timeout=5)
+        self.server_thread = None
+        
+    def stream_server(self):
+        """Where stream frames go: the web server processes when running, else the web_server module"""
+        return self.web_bridge if self.web_bridge is not None else self.web_server
             
-            # TODO: Add clean shutdown of web server if needed
-            # Currently relying on daemon thread to terminate with app
-            
+    def invalidate_stream(self):
+        """Mark the streamed picture as changed"""
+        self._stream_dirty = True
+        self.stream_invalidated.emit()
+        
+    def _stream_keepalive(self):
+        """Resend the picture while nothing changes, so viewers know the stream is alive"""
+        if (time.monotonic() - self._last_stream_capture) * 1000.0 < self.stream_keepalive_ms / 2:
+            # Frames are still going out
+            return
+        # An unchanged picture gives an empty delta, which isn't sent at all
+        self.stream_encoder.request_keyframe()
+        self.invalidate_stream()
+        
+    def _schedule_stream_frame(self):
+        """Schedule a capture for the next free slot under the frame rate cap"""
+        if not self.web_enabled or not self._stream_dirty or self.web_timer.isActive():
+            return
+        if self.is_pacing():
+            # Captured on the pacer's ticks instead
+            return
+        elapsed_ms = (time.monotonic() - self._last_stream_capture) * 1000.0
+        self.web_timer.start(int(max(0, self.stream_min_interval_ms - elapsed_ms)))
+        
     def broadcast_frame(self):
         """Capture and broadcast current window content"""
-        if not self.web_enabled:
+        server = self.stream_server()
+        if not self.web_enabled or not self._stream_dirty or server is None:
+            return
+        has_pixel_clients = server.has_clients()
+        has_state_clients = server.has_state_clients()
+        if not has_pixel_clients and not has_state_clients:
+            # Nothing to send to; a connecting client invalidates the stream again
             return
             
-        try:
-            # Create a QImage with the window size
-            image = QImage(self.size(), QImage.Format_ARGB32)
-            image.fill(self._background_color)
-            
-            # Create painter for the image
-            painter = QPainter(image)
-            
-            # Draw all content
-            self.render(painter)
-            
-            # Draw fields
-            for field in self.fields.values():
-                field_pos = field.pos()
-                field_size = field.size()
-                
-                # Create temporary image for field
-                field_image = QImage(field_size, QImage.Format_ARGB32)
-                field_image.fill(Qt.transparent)
-                
-                # Render field to its image
-                field_painter = QPainter(field_image)
-                field.render(field_painter)
-                field_painter.end()
-                
-                # Draw field image at correct position
-                painter.drawImage(field_pos, field_image)
-            
-            # Draw NDI frame if present
-            if self.ndi_frame is not None:
-                scaled_frame = self.get_scaled_ndi_frame()
-                if scaled_frame is not None:
-                    painter.drawImage(scaled_frame[0], scaled_frame[1])
-            
-            painter.end()
+        self._stream_dirty = False
+        self._last_stream_capture = time.monotonic()
+        
+        if has_state_clients:
+            # Field model viewers only need the model, which the server diffs
+            server.publish_state(self.get_stream_state())
+        if not has_pixel_clients:
+            return
             
-            # Convert to JPEG
-            img_buffer = QBuffer()
-            img_buffer.open(QBuffer.ReadWrite)
-            image.save(img_buffer, "JPEG", quality=85)
+        try:
+            # The compositor reuses its buffer, so the encoder gets its own copy
+            image = self.compose_frame().copy()
             
-            # Use stored web_server module
-            if hasattr(self, 'web_server'):
-                self.web_server.broadcast_frame(img_buffer.data().data())
-            else:
-                print("Web server module not available")
+            # Hand the snapshot to the encoder pool, which encodes it once per requested rendition
+            self.stream_encoder.submit(image, server.active_renditions())
         except Exception as e:
             print(f"Error broadcasting frame: {e}")
             import traceback
             traceback.print_exc()
             
-    def update(self):
-        super().update()
-        if self.ndi_frame is not None:
-            self.ndi_timer.start()
-        else:
-            self.ndi_timer.stop()
-
-class NDIlib_frame_type:
-    NONE = 0
-    VIDEO = 1
-    AUDIO = 2
-    METADATA = 3
-    ERROR = 4
-    STATUS_CHANGE = 100
-
-class NDIlib_source_t(ctypes.Structure):
-    _fields_ = [
-        ("p_ndi_name", ctypes.c_char_p),
-        ("p_url_address", ctypes.c_char_p)
-    ]
-    
-class NDIlib_find_create_t(ctypes.Structure):
-    _fields_ = [
-        ("show_local_sources", ctypes.c_bool),
-        ("p_groups", ctypes.c_char_p),
-        ("p_extra_ips", ctypes.c_char_p)
-    ]
-    
-class NDIlib_recv_create_v3_t(ctypes.Structure):
-    _fields_ = [
-        ("source_to_connect_to", NDIlib_source_t),
-        ("color_format", ctypes.c_int),
-        ("bandwidth", ctypes.c_int),
-        ("allow_video_fields", ctypes.c_bool),
-        ("p_ndi_recv_name", ctypes.c_char_p)
-    ]
-    
-class NDIlib_video_frame_v2_t(ctypes.Structure):
-    _fields_ = [
-        ("xres", ctypes.c_int),
-        ("yres", ctypes.c_int),
-        ("FourCC", ctypes.c_int),
-        ("frame_rate_N", ctypes.c_int),
-        ("frame_rate_D", ctypes.c_int),
-        ("picture_aspect_ratio", ctypes.c_float),
-        ("frame_format_type", ctypes.c_int),
-        ("timecode", ctypes.c_longlong),
-        ("p_data", ctypes.c_void_p),
-        ("line_stride_in_bytes", ctypes.c_int),
-        ("p_metadata", ctypes.c_char_p),
-        ("timestamp", ctypes.c_longlong)
-    ]
+    def invalidate_frame(self, rect=None):
+        """
+        Mark part of the composited frame (or all of it) as changed.
 
-class NDIReceiver:
-    def __init__(self):
-        self.ndi = None
-        self.finder = None
-        self.receiver = None
-        self.video_frame = None
-        self.current_source = None
-        self.sources = []
-        self.sources_ptr = None
-        
-    def initialize(self):
-        # Load NDI library - try multiple possible paths
-        ndi_paths = [
-            Path("C:/Program Files/NDI/NDI 6 Runtime/v6/Processing.NDI.Lib.x64.dll"),
-            Path("C:/Program Files/NDI/NDI 6 SDK/Lib/x64/Processing.NDI.Lib.x64.dll"),
-            Path("C:/Program Files/NDI/NDI 5 Runtime/Processing.NDI.Lib.x64.dll"),
-            Path("C:/Program Files/NDI/NDI 5 SDK/Lib/x64/Processing.NDI.Lib.x64.dll"),
-            Path("Processing.NDI.Lib.x64.dll")
-        ]
-        
-        for path in ndi_paths:
-            try:
-                print(f"Trying NDI path: {path}")
-                if path.exists():
-                    self.ndi = ctypes.WinDLL(str(path))
-                    print(f"Found NDI DLL at: {path}")
-                    print(f"Successfully loaded NDI from: {path}")
-                    break
-            except Exception as e:
-                print(f"Error loading {path}: {e}")
-                continue
-                
-        if not self.ndi:
-            print("Failed to initialize NDI: Could not find NDI Runtime. Please make sure NDI Runtime is installed.")
-            return False
-            
-        # Set up function signatures
-        self.ndi.NDIlib_initialize.restype = ctypes.c_bool
-        
-        self.ndi.NDIlib_find_create_v2.argtypes = [ctypes.POINTER(NDIlib_find_create_t)]
-        self.ndi.NDIlib_find_create_v2.restype = ctypes.c_void_p
-        
-        self.ndi.NDIlib_find_get_current_sources.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint32)]
-        self.ndi.NDIlib_find_get_current_sources.restype = ctypes.POINTER(NDIlib_source_t)
-        
-        self.ndi.NDIlib_recv_create_v3.argtypes = [ctypes.POINTER(NDIlib_recv_create_v3_t)]
-        self.ndi.NDIlib_recv_create_v3.restype = ctypes.c_void_p
-        
-        self.ndi.NDIlib_recv_destroy.argtypes = [ctypes.c_void_p]
-        self.ndi.NDIlib_recv_destroy.restype = None
+        Schedules a repaint of just that area and a stream capture.
+        """
+        with self._dirty_lock:
+            if rect is None:
+                self._dirty_all = True
+            else:
+                self._dirty_region = self._dirty_region.united(rect)
+        if rect is None:
+            QMainWindow.update(self)
+        else:
+            QMainWindow.update(self, rect)
+        self.invalidate_stream()
         
-        self.ndi.NDIlib_find_destroy.argtypes = [ctypes.c_void_p]
-        self.ndi.NDIlib_find_destroy.restype = None
+    def compose_frame(self):
+        """
+        Return the window content (background, NDI frame, fields) as a QImage.
+
+        The frame is composited into a reused buffer, which both the window and
+        the web stream use, and only the invalidated areas are redrawn. Copy it
+        before keeping it around.
+        """
+        with self._dirty_lock:
+            dirty_all = self._dirty_all or self._frame is None or self._frame.size() != self.size()
+            region = self._dirty_region
+            self._dirty_all = False
+            self._dirty_region = QRegion()
+        if not dirty_all:
+            region = region.intersected(self.rect())
+            if region.isEmpty():
+                return self._frame
+        if self._frame is None or self._frame.size() != self.size():
+            self._frame = QImage(self.size(), QImage.Format_ARGB32)
+        self.frames_composited += 1
+        
+        image = self._frame
+        painter = QPainter(image)
+        if dirty_all:
+            region = QRegion(self.rect())
+        else:
+            painter.setClipRegion(region)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.fillRect(region.boundingRect(), self._background_color)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
         
-        print("Initializing NDI...")
-        if not self.ndi.NDIlib_initialize():
-            print("Failed to initialize NDI library")
-            return False
-            
-        print("Creating NDI finder...")
-        find_create = NDIlib_find_create_t(show_local_sources=True, p_groups=None, p_extra_ips=None)
-        self.finder = self.ndi.NDIlib_find_create_v2(ctypes.byref(find_create))
-        if not self.finder:
-            print("Failed to create NDI finder")
-            return False
-            
-        print("NDI initialized successfully")
-        return True
+        # Draw NDI frame centered, like the window does
+        if self.ndi_frame is not None and region.intersects(self.get_ndi_rect()):
+            scaled_frame, (width, height) = self.get_scaled_ndi_frame()
+            if scaled_frame is not None:
+                painter.drawImage((self.width() - width) // 2, (self.height() - height) // 2, scaled_frame)
+                frame_id, _, _, captured = self._scaled_ndi
+                if frame_id != self._painted_ndi_id:
+                    # First time this frame reaches the screen
+                    self._painted_ndi_id = frame_id
+                    if captured is not None:
+                        if self.video_source is not None:
+                            self.video_source.record_paint(captured)
         
-    def find_sources(self):
-        if not self.finder:
-            print("Cannot find sources - NDI finder not initialized")
-            return []
-            
-        # Wait for sources to be discovered
-        time.sleep(1.0)  # Give NDI time to discover sources
+        # Draw border if transparent
+        if self._background_color.alpha() < 255:
+            painter.setPen(QColor("white"))
+            painter.drawRect(0, 0, self.width() - 1, self.height() - 1)
         
-        # Get number of sources
-        num_sources = ctypes.c_uint32(0)
-        self.sources_ptr = self.ndi.NDIlib_find_get_current_sources(self.finder, ctypes.byref(num_sources))
+        # Draw fields from their cached images, no widget rendering involved
+        for field in self.fields.values():
+            if field.isHidden() or not region.intersects(field.geometry()):
+                continue
+            field.paint_count += 1
+            raster = self.field_cache.get(field)
+            if raster is not None:
+                painter.drawImage(field.pos(), raster)
+                continue
+            painter.save()
+            painter.translate(field.pos())
+            painter.setClipRect(0, 0, field.width(), field.height())
+            field.draw(painter)
+            painter.restore()
+        
+        painter.end()
+        return image
+        
+    def get_stream_state(self):
+        """Describe the canvas and fields for field model viewers"""
+        fields = {}
+        for field_id, field in self.fields.items():
+            fields[field_id] = {
+                'x': field.x(),
+                'y': field.y(),
+                'width': field.width(),
+                'height': field.height(),
+                'visible': field.isVisible(),
+                'show_border': field.show_border,
+                'title': field.title.to_dict(),
+                'content': field.content.to_dict(),
+            }
+        color = self._background_color
+        return {
+            'canvas': {
+                'width': self.width(),
+                'height': self.height(),
+                'background': f"rgba({color.red()}, {color.green()}, {color.blue()}, {color.alphaF():.3f})",
+            },
+            'fields': fields,
+        }
         
-        if not self.sources_ptr or num_sources.value == 0:
-            self.sources = []
-            return []
-            
-        # Convert sources to Python list
-        self.sources = []
-        for i in range(num_sources.value):
-            source = self.sources_ptr[i]
-            name = source.p_ndi_name.decode('utf-8') if source.p_ndi_name else "Unknown"
-            self.sources.append(name)
-            
-        print(f"Found {len(self.sources)} NDI sources")
-        for source in self.sources:
-            print(f"Found NDI source: {source}")
+    def _on_stream_client_connected(self, rendition):
+        """Send a keyframe to a newly connected viewer (called from the server thread)"""
+        # None asks for keyframes of every rendition (e.g. a web process lost frames)
+        self.stream_encoder.request_keyframe(rendition)
+        self.invalidate_stream()
+            
+    def publish_stream_state(self):
+        """Send the field model to field model viewers without capturing a picture"""
+        server = self.stream_server()
+        if self.web_enabled and server is not None:
+            server.publish_state(self.get_stream_state())
+            
+    def _on_stream_connections_changed(self):
+        """Free the encoder state of renditions nobody watches any more (called from the server thread)"""
+        server = self.stream_server()
+        if server is not None:
+            self.stream_encoder.drop_unused_renditions(server.active_renditions())
+            
+    def _publish_encoded_frame(self, encoded):
+        """Pass an encoded frame to the web server (called from encoder threads)"""
+        server = self.stream_server()
+        if server is None:
+            print("Web server module not available")
+        elif encoded.keyframe:
+            server.broadcast_frame(encoded.jpeg, encoded.width, encoded.height, encoded.rendition)
+        else:
+            server.broadcast_delta(encoded.tiles, encoded.width, encoded.height, encoded.rendition)
             
-        return self.sources
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.video_source is not None:
+            self.video_source.set_display_size(self.width(), self.height())
+        self.invalidate_frame()
         
-    def connect_to_source(self, source_index):
-        if source_index >= len(self.sources):
-            print(f"Invalid source index: {source_index}")
-            return False
-            
-        if not self.sources_ptr:
-            print("No sources available")
-            return False
-            
-        try:
-            # Clean up existing receiver
-            if self.receiver:
-                self.ndi.NDIlib_recv_destroy(ctypes.c_void_p(self.receiver))
-                self.receiver = None
-                self.current_source = None  # Clear current source reference
-                
-            # Create receiver for the selected source
-            source = self.sources_ptr[source_index]
-            
-            # Create receiver description
-            recv_desc = NDIlib_recv_create_v3_t()
-            recv_desc.source_to_connect_to = source
-            recv_desc.color_format = 0  # BGRX_BGRA = 0
-            recv_desc.bandwidth = 100  # Highest quality (100 = highest, -10 = audio only)
-            recv_desc.allow_video_fields = False
-            recv_desc.p_ndi_recv_name = None
-            
-            # Create receiver with proper error handling
-            try:
-                self.receiver = self.ndi.NDIlib_recv_create_v3(ctypes.byref(recv_desc))
-                if not self.receiver:
-                    print("Failed to create receiver")
-                    return False
-                    
-                # Store current source index
-                self.current_source = source_index
-                print(f"Connected to NDI source: {self.sources[source_index]}")
-                return True
-                
-            except Exception as e:
-                print(f"Failed to create receiver: {e}")
-                return False
-                
-        except Exception as e:
-            print(f"Error connecting to source: {e}")
-            return False
-
-    def receive_frame(self):
-        """Receive a frame from NDI source"""
-        if not self.receiver or self.current_source is None:
-            return None
-            
-        video_frame = NDIlib_video_frame_v2_t()
-        if self.ndi.NDIlib_recv_capture_v2(ctypes.c_void_p(self.receiver), ctypes.byref(video_frame), None, None, 0) == NDIlib_frame_type.VIDEO:
-            try:
-                # Get frame dimensions and data
-                width = video_frame.xres
-                height = video_frame.yres
-                buffer_size = width * height * 4  # RGBA format
-                
-                # Create buffer and copy frame data
-                buffer = (ctypes.c_ubyte * buffer_size).from_address(video_frame.p_data)
-                
-                # Create QImage with correct format (NDI uses BGRA)
-                image = QImage(
-                    buffer,
-                    width,
-                    height,
-                    video_frame.line_stride_in_bytes,
-                    QImage.Format_ARGB32  # This will handle BGRA correctly
-                )
-                
-                # Create a deep copy before freeing the frame
-                copied_image = image.copy()
-                
-                # Free the frame
-                self.ndi.NDIlib_recv_free_video_v2(ctypes.c_void_p(self.receiver), ctypes.byref(video_frame))
-                
-                return copied_image
-            except Exception as e:
-                print(f"Error receiving NDI frame: {e}")
-                self.ndi.NDIlib_recv_free_video_v2(ctypes.c_void_p(self.receiver), ctypes.byref(video_frame))
-                return None
-        return None
-        
-    def cleanup(self):
-        """Clean up NDI resources"""
-        if self.receiver:
-            try:
-                self.ndi.NDIlib_recv_destroy(ctypes.c_void_p(self.receiver))
-            except:
-                pass
-            self.receiver = None
-            
-        if self.finder:
-            try:
-                self.ndi.NDIlib_find_destroy(ctypes.c_void_p(self.finder))
-            except:
-                pass
-            self.finder = None
-            
-        if self.ndi:
-            try:
-                self.ndi.NDIlib_destroy()
-            except:
-                pass
-            self.ndi = None
-            
-    def __del__(self):
-        self.cleanup()
+    def update(self):
+        self.invalidate_frame()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -929,6 +1254,15 @@ class MainWindow(QMainWindow):
         web_port_layout.addWidget(self.web_port_input)
         settings_layout.addLayout(web_port_layout)
         
+        # Web server process settings (0 serves viewers from a thread in this process)
+        web_process_layout = QHBoxLayout()
+        web_process_layout.addWidget(QLabel("Web Server Processes:"))
+        self.web_process_input = QSpinBox()
+        self.web_process_input.setRange(0, 8)
+        self.web_process_input.setValue(0)
+        web_process_layout.addWidget(self.web_process_input)
+        settings_layout.addLayout(web_process_layout)
+        
         # Monitor selection
         monitor_layout = QHBoxLayout()
         monitor_layout.addWidget(QLabel("Display Monitor:"))
@@ -977,9 +1311,28 @@ class MainWindow(QMainWindow):
         
         self.ndi_source_combo = QComboBox()
         self.ndi_source_combo.currentIndexChanged.connect(self.update_ndi_source)
+        self.display_window.ndi_sources_changed.connect(self.update_ndi_sources)
         ndi_layout.addWidget(self.ndi_source_combo)
+        
+        self.ndi_fast_scaling = QCheckBox("Fast Scaling")
+        self.ndi_fast_scaling.stateChanged.connect(
+            lambda state: self.display_window.set_ndi_fast_scaling(state == Qt.Checked))
+        ndi_layout.addWidget(self.ndi_fast_scaling)
+        
+        self.ndi_uyvy = QCheckBox("Half Bandwidth (UYVY)")
+        self.ndi_uyvy.setChecked(False)
+        self.ndi_uyvy.stateChanged.connect(
+            lambda state: self.display_window.set_ndi_uyvy(state == Qt.Checked))
+        ndi_layout.addWidget(self.ndi_uyvy)
         bg_layout.addLayout(ndi_layout)
         
+        # NDI receive statistics, refreshed once a second
+        self.ndi_stats_label = QLabel("")
+        bg_layout.addWidget(self.ndi_stats_label)
+        self.ndi_stats_timer = QTimer()
+        self.ndi_stats_timer.timeout.connect(self.update_ndi_stats)
+        self.ndi_stats_timer.start(1000)
+        
         # Web streaming settings
         web_group = QGroupBox("Web Streaming")
         web_layout = QVBoxLayout()
@@ -1015,6 +1368,7 @@ class MainWindow(QMainWindow):
         field_list_group = QGroupBox("Fields")
         field_list_inner = QVBoxLayout()
         self.fields_list = QListWidget()
+        self.field_items = {}  # field_id -> QListWidgetItem, avoids scanning the list
         self.fields_list.currentItemChanged.connect(self.load_field)
         field_list_inner.addWidget(self.fields_list)
         field_list_group.setLayout(field_list_inner)
@@ -1307,16 +1661,50 @@ class MainWindow(QMainWindow):
         enabled = state == Qt.Checked
         if self.display_window.enable_ndi(enabled):
             if enabled:
-                # Update source list
-                sources = self.display_window.get_ndi_sources()
+                # Sources are filled in by update_ndi_sources as they are discovered
                 self.ndi_source_combo.clear()
-                self.ndi_source_combo.addItems(sources)
         else:
             self.ndi_enabled.setChecked(False)
             
+    def update_ndi_stats(self):
+        """Show received frame rate, dropped frames and latency of the background video"""
+        source = self.display_window.video_source
+        if source is None:
+            self.ndi_stats_label.setText("")
+            return
+        stats = source.stats()
+        proxy = " (proxy stream)" if stats.get('proxy') else ""
+        text = (f"{source.name}: {stats['fps']:.1f} fps{proxy}, {stats['dropped']} dropped, "
+                f"{stats['latency_ms']:.0f} ms capture to screen")
+        if stats['static_fps'] > 0:
+            text += f", {stats['static_fps']:.0f} unchanged frames/s skipped"
+        if self.display_window.is_pacing():
+            pacing = self.display_window.frame_pacer.stats()
+            text += (f"\nPaced at {pacing['output_fps']:.2f} fps: {pacing['judder_ms']:.1f} ms judder, "
+                     f"{pacing['duplicated']} duplicated, {pacing['dropped']} dropped")
+        self.ndi_stats_label.setText(text)
+        
+    def update_ndi_sources(self, added, removed):
+        """Add and remove discovered NDI sources without disturbing the selected one"""
+        current = self.ndi_source_combo.currentText()
+        self.ndi_source_combo.blockSignals(True)
+        for name in removed:
+            index = self.ndi_source_combo.findText(name)
+            # Keep the selected source listed, it is reconnected when it comes back
+            if index >= 0 and name != current:
+                self.ndi_source_combo.removeItem(index)
+        for name in added:
+            if self.ndi_source_combo.findText(name) < 0:
+                self.ndi_source_combo.addItem(name)
+        self.ndi_source_combo.blockSignals(False)
+        
+        # Connect to the first source found, like picking it from the list
+        if not current and self.ndi_source_combo.count() > 0:
+            self.update_ndi_source(self.ndi_source_combo.currentIndex())
+            
     def update_ndi_source(self, index):
         if index >= 0:
-            self.display_window.connect_to_ndi_source(index)
+            self.display_window.connect_to_ndi_source(self.ndi_source_combo.itemText(index))
             
     def update_monitor_list(self):
         self.monitor_combo.clear()
@@ -1408,29 +1796,7 @@ class MainWindow(QMainWindow):
                 if len(args) > 0:
                     value = args[0]
                     
-                    if property_name == "content":
-                        field.content.text = str(value)
-                    elif property_name == "title":
-                        field.title.text = str(value)
-                    elif property_name == "x":
-                        field.move(int(value), field.y())
-                    elif property_name == "y":
-                        field.move(field.x(), int(value))
-                    elif property_name == "width":
-                        field.resize(int(value), field.height())
-                    elif property_name == "height":
-                        field.resize(field.width(), int(value))
-                    elif property_name == "font_size":
-                        field.content.font_size = int(value)
-                        field.title.font_size = int(value)
-                    elif property_name == "font_color":
-                        field.content.font_color = str(value)
-                        field.title.font_color = str(value)
-                    elif property_name == "show_border":
-                        field.show_border = bool(value)
-                    
-                    field.update()
-                    self.display_window.update()
+                    self.display_window.apply_field_property(field, property_name, value)
             
         except Exception as e:
             print(f"Error handling OSC message: {e}")
@@ -1439,20 +1805,8 @@ class MainWindow(QMainWindow):
     def _create_field_from_osc(self, field_id):
         """Create a new field from OSC message on the main thread"""
         try:
-            field = self.display_window.add_field(
-                field_id,
-                x=200, y=10,  # Default position
-                width=300, height=200,  # Default size
-                title_text=field_id,
-                title_font_family="Arial",
-                title_font_size=24,
-                title_font_color="white",
-                content_font_family="Arial",
-                content_font_size=32,
-                content_font_color="white",
-                show_border=True
-            )
-            self.fields_list.addItem(field_id)
+            self.display_window.add_osc_field(field_id)
+            self._field_list_item(field_id)
             self.save_config()  # Save the new field configuration
         except Exception as e:
             print(f"Error creating field from OSC: {e}")
@@ -1518,9 +1872,9 @@ class MainWindow(QMainWindow):
         )
         
         # Update field list
-        if self.fields_list.findItems(field_id, Qt.MatchExactly):
+        if field_id in self.field_items:
             return
-        self.fields_list.addItem(field_id)
+        self._field_list_item(field_id)
         self.save_config()
         
     def update_field(self):
@@ -1557,6 +1911,7 @@ class MainWindow(QMainWindow):
             
         field_id = current.text()
         self.display_window.remove_field(field_id)
+        self.field_items.pop(field_id, None)
         self.fields_list.takeItem(self.fields_list.row(current))
         self.save_config()
         
@@ -1565,10 +1920,15 @@ class MainWindow(QMainWindow):
         # Clean up OSC server
         self.cleanup_osc_server()
         
-        # Clean up NDI
+        # Clean up NDI and other background video
+        if self.display_window.video_source:
+            self.display_window.video_source.cleanup()
         if self.display_window.ndi_receiver:
             self.display_window.ndi_receiver.cleanup()
             
+        # Stop the web server
+        self.display_window.stop_web_server()
+            
         # Save fields
         self.save_config()
         
@@ -1586,30 +1946,9 @@ class MainWindow(QMainWindow):
             with open('config.json', 'r') as f:
                 config = json.load(f)
                 
-            # Load background color
-            if 'background_color' in config:
-                self.display_window.set_background_color(config['background_color'])
-                
-            # Load fields
-            if 'fields' in config:
-                for field_id, field_data in config['fields'].items():
-                    self.display_window.add_field(
-                        field_id,
-                        field_data['x'],
-                        field_data['y'],
-                        field_data['width'],
-                        field_data['height'],
-                        field_data.get('title_text', ''),
-                        field_data.get('title_font_family', 'Arial'),
-                        field_data.get('title_font_size', 20),
-                        field_data.get('title_font_color', 'white'),
-                        field_data.get('content_font_family', 'Arial'),
-                        field_data.get('content_font_size', 20),
-                        field_data.get('content_font_color', 'white'),
-                        field_data.get('show_border', True)
-                    )
-                    # Add to field list
-                    self.fields_list.addItem(field_id)
+            for field_id in self.display_window.apply_config(config):
+                # Add to field list
+                self._field_list_item(field_id)
                     
         except FileNotFoundError:
             pass
@@ -1640,20 +1979,27 @@ class MainWindow(QMainWindow):
         with open('config.json', 'w') as f:
             json.dump(config, f, indent=4)
             
+    def _field_list_item(self, field_id):
+        """Return the fields list item of a field, adding it if needed"""
+        item = self.field_items.get(field_id)
+        if item is None:
+            item = QListWidgetItem(field_id)
+            self.fields_list.addItem(item)
+            self.field_items[field_id] = item
+        return item
+        
     def add_field_to_list(self, field_id, field):
         """Add field to the fields list widget"""
         # Add to fields list widget if not already there
-        if not self.fields_list.findItems(field_id, Qt.MatchExactly):
-            item = QListWidgetItem(field_id)
+        if field_id not in self.field_items:
+            item = self._field_list_item(field_id)
             item.setFlags(item.flags() | Qt.ItemIsEditable)
-            self.fields_list.addItem(item)
             self.fields_list.setCurrentItem(item)
         
     def remove_field_from_list(self, field_id):
         """Remove field from the fields list widget"""
-        # Find and remove from fields list widget
-        items = self.fields_list.findItems(field_id, Qt.MatchExactly)
-        for item in items:
+        item = self.field_items.pop(field_id, None)
+        if item is not None:
             self.fields_list.takeItem(self.fields_list.row(item))
             
         # Update selection
@@ -2041,7 +2387,156 @@ class MainWindow(QMainWindow):
         """Apply Companion settings"""
         self.osc_client.set_target(self.companion_ip_input.text(), self.companion_port_input.value())
         
+class HeadlessController(QObject):
+    """
+    Runs the display without a control panel, e.g. on a render server.
+
+    The display is composited offscreen at a fixed canvas size, fields come from
+    the config file and OSC, and the result is only served to web viewers.
+    """
+    # OSC messages arrive on the server thread and are applied on the GUI thread
+    osc_received = pyqtSignal(str, list)
+    
+    def __init__(self, config_path='config.json', width=1920, height=1080, fps=30,
+                 osc_port=9191, web_port=8181, web_processes=0):
+        """
+        Initialize the headless display.
+
+        Args:
+            config_path (str): Config file with background color and fields ('' for none)
+            width (int): Canvas width in pixels
+            height (int): Canvas height in pixels
+            fps (int): Maximum stream frame rate
+            osc_port (int): Port to receive OSC messages on
+            web_port (int): Port of the web server
+            web_processes (int): Web server processes (0 = thread in this process)
+        """
+        super().__init__()
+        self.osc_port = osc_port
+        self.server = None
+        self.server_thread = None
+        
+        self.display_window = DisplayWindow()
+        self.display_window.setAttribute(Qt.WA_DontShowOnScreen)
+        self.display_window.setFixedSize(width, height)
+        self.display_window.stream_min_interval_ms = max(1, int(1000 / max(1, fps)))
+        self.display_window.web_port = web_port
+        self.display_window.web_process_workers = web_processes
+        
+        if config_path:
+            try:
+                with open(config_path, 'r') as f:
+                    self.display_window.apply_config(json.load(f))
+            except FileNotFoundError:
+                print(f"Config file {config_path} not found, starting without fields")
+        
+        self.display_window.show()
+        self.osc_received.connect(self.handle_osc_message)
+        
+    def start(self, web=True):
+        """Start receiving OSC and serving web viewers"""
+        try:
+            dispatcher = Dispatcher()
+            dispatcher.map("/field/*", lambda address, *args: self.osc_received.emit(address, list(args)))
+            self.server = BlockingOSCUDPServer(("0.0.0.0", self.osc_port), dispatcher)
+            self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+            self.server_thread.start()
+            print(f"OSC Server listening on port {self.osc_port}")
+        except Exception as e:
+            print(f"Error starting OSC server: {e}")
+        
+        if web:
+            self.display_window.enable_web_streaming(True)
+            
+    def stop(self):
+        """Stop the OSC server"""
+        if self.server:
+            self.server.shutdown()
+            self.server = None
+        self.display_window.stop_web_server()
+            
+    def handle_osc_message(self, address, args):
+        """Apply a /field/<id>/<property> message"""
+        try:
+            parts = address.split('/')
+            if len(parts) < 3:
+                return
+            field_id = parts[2]
+            
+            field = self.display_window.fields.get(field_id)
+            if not field:
+                self.display_window.add_osc_field(field_id)
+                field = self.display_window.fields[field_id]
+                
+            if len(parts) > 3 and len(args) > 0:
+                self.display_window.apply_field_property(field, parts[3], args[0])
+        except Exception as e:
+            print(f"Error handling OSC message: {e}")
+
+def parse_args(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description="StageDeck stage display")
+    parser.add_argument('--headless', action='store_true',
+                        help="run without windows, only serving web viewers (for render servers)")
+    parser.add_argument('--width', type=int, default=1920, help="headless canvas width")
+    parser.add_argument('--height', type=int, default=1080, help="headless canvas height")
+    parser.add_argument('--fps', type=int, default=30, help="headless maximum stream frame rate")
+    parser.add_argument('--config', default='config.json', help="headless config file with fields")
+    parser.add_argument('--osc-port', type=int, default=9191, help="headless OSC port")
+    parser.add_argument('--web-port', type=int, default=8181, help="headless web port")
+    parser.add_argument('--web-processes', type=int, default=0,
+                        help="headless web server processes (0 = thread in this process)")
+    parser.add_argument('--snapshot', metavar='PNG',
+                        help="headless: render one frame to an image file and exit")
+    parser.add_argument('--output-fps', type=float, default=0.0,
+                        help="show background video at this frame rate (default: the source's own rate)")
+    parser.add_argument('--video', metavar='SOURCE',
+                        help="background video instead of NDI: a video file, a capture device index, "
+                             "or synthetic[:WIDTHxHEIGHT[@FPS]] for a test pattern")
+    # Qt takes its own options from the remaining arguments
+    return parser.parse_known_args(argv[1:])
+
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    # Web server processes re-launch the frozen executable
+    multiprocessing.freeze_support()
+    args, qt_args = parse_args(sys.argv)
+    
+    if args.headless:
+        # No display needed
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        app = QApplication(sys.argv[:1] + qt_args)
+        controller = HeadlessController(args.config, args.width, args.height, args.fps,
+                                        args.osc_port, args.web_port, args.web_processes)
+        controller.display_window.output_fps = args.output_fps
+        if args.video:
+            controller.display_window.set_video_source(open_video_source(args.video))
+        if args.snapshot:
+            # Give a background video source time to deliver its first frame
+            deadline = time.monotonic() + 2.0
+            while (controller.display_window.video_source is not None
+                   and controller.display_window.ndi_frame is None and time.monotonic() < deadline):
+                app.processEvents()
+                time.sleep(0.01)
+            app.processEvents()
+            if not controller.display_window.compose_frame().save(args.snapshot):
+                print(f"Could not write {args.snapshot}")
+                sys.exit(1)
+            sys.exit(0)
+        controller.start()
+        # Ctrl+C quits the event loop so controller.stop still runs. Python only
+        # handles signals between bytecodes, so a timer wakes it up regularly
+        # while Qt waits for events.
+        import signal
+        signal.signal(signal.SIGINT, lambda *args: app.quit())
+        signal_timer = QTimer()
+        signal_timer.timeout.connect(lambda: None)
+        signal_timer.start(200)
+        app.aboutToQuit.connect(controller.stop)
+        sys.exit(app.exec_())
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
+    window.display_window.output_fps = args.output_fps
+    if args.video:
+        window.display_window.set_video_source(open_video_source(args.video))
     sys.exit(app.exec_())
@@ -67,7 +67,11 @@ a = Analysis(
         'starlette.types',
         'starlette.datastructures',
         'starlette.staticfiles',
-        'web_server'
+        'web_server',
+        'frame_bus',
+        'video_sources',
+        'frame_pacer',
+        'multiprocessing.shared_memory'
     ],
     hookspath=[],
     hooksconfig={},
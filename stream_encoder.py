@@ -0,0 +1,268 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+from PyQt5.QtGui import QImage
+
+TILE_SIZE = 64  # Tile edge in pixels for delta frames
+KEYFRAME_INTERVAL = 5.0  # Seconds between forced full frames in delta mode
+MAX_DELTA_RATIO = 0.5  # Send a full frame instead when more tiles than this changed
+
+def qimage_to_array(image: QImage) -> np.ndarray:
+    """
+    View a QImage as an (height, width, 4) BGRA array without copying.
+
+    The array borrows the image memory, so the image must be kept alive while it is used.
+    """
+    if image.format() not in (QImage.Format_ARGB32, QImage.Format_RGB32, QImage.Format_ARGB32_Premultiplied):
+        image = image.convertToFormat(QImage.Format_ARGB32)
+    width = image.width()
+    height = image.height()
+    ptr = image.constBits()
+    ptr.setsize(image.bytesPerLine() * height)
+    array = np.frombuffer(ptr, dtype=np.uint8).reshape(height, image.bytesPerLine())
+    return array[:, :width * 4].reshape(height, width, 4)
+
+def encode_jpeg(pixels: np.ndarray, quality: int = 85) -> bytes:
+    """Encode a BGRA/BGR array to JPEG bytes (releases the GIL, safe from worker threads)"""
+    bgr = np.ascontiguousarray(pixels[:, :, :3])
+    ok, data = cv2.imencode('.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return data.tobytes()
+
+def changed_tiles(current: np.ndarray, previous: np.ndarray, tile_size: int = TILE_SIZE) -> np.ndarray:
+    """Return a (rows, cols) bool mask of tiles whose pixels differ between two frames"""
+    height, width = current.shape[:2]
+    # Compare whole pixels at once as 32-bit words
+    current32 = current.view(np.uint32).reshape(height, width)
+    previous32 = previous.view(np.uint32).reshape(height, width)
+    changed = current32 != previous32
+    rows = np.logical_or.reduceat(changed, np.arange(0, height, tile_size), axis=0)
+    return np.logical_or.reduceat(rows, np.arange(0, width, tile_size), axis=1)
+
+def scale_to_width(pixels: np.ndarray, max_width: int) -> np.ndarray:
+    """Downscale a frame to at most max_width pixels wide (0 keeps the full size)"""
+    height, width = pixels.shape[:2]
+    if max_width <= 0 or width <= max_width:
+        return pixels
+    new_height = max(1, round(height * max_width / width))
+    return cv2.resize(pixels, (max_width, new_height), interpolation=cv2.INTER_AREA)
+
+class EncodedFrame:
+    """Result of encoding one snapshot: either a full JPEG or a list of changed tiles"""
+    def __init__(self, width, height, jpeg=None, tiles=None, rendition=None):
+        self.width = width
+        self.height = height
+        self.jpeg = jpeg
+        self.tiles = tiles  # [(x, y, w, h, jpeg_bytes), ...]
+        self.rendition = rendition  # (max_width, quality)
+
+    @property
+    def keyframe(self):
+        return self.tiles is None
+
+class DeltaEncoder:
+    """
+    Remembers what viewers last received and encodes either a keyframe or the changed tiles.
+
+    Frames must be processed in order, so callers hold `lock` around encode().
+    """
+
+    def __init__(self, quality=85, tile_size=TILE_SIZE, keyframe_interval=KEYFRAME_INTERVAL):
+        self.quality = quality
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.lock = threading.Lock()
+        self.previous = None
+        self.last_keyframe = 0.0
+        self.keyframe_requested = True
+        self.last_sequence = -1
+
+        # Counters
+        self.keyframes = 0
+        self.deltas = 0
+        self.tiles_sent = 0
+
+    def request_keyframe(self):
+        """Force the next frame to be a full frame (e.g. for a viewer that just joined)"""
+        self.keyframe_requested = True
+
+    def encode(self, pixels: np.ndarray, allow_delta=True):
+        """Encode a BGRA frame. Returns an EncodedFrame, or None when nothing changed."""
+        height, width = pixels.shape[:2]
+        now = time.monotonic()
+        needs_keyframe = (not allow_delta
+                          or self.keyframe_requested
+                          or self.previous is None
+                          or self.previous.shape != pixels.shape
+                          or now - self.last_keyframe >= self.keyframe_interval)
+
+        if not needs_keyframe:
+            mask = changed_tiles(pixels, self.previous, self.tile_size)
+            changed = np.argwhere(mask)
+            if len(changed) == 0:
+                return None
+            if len(changed) <= mask.size * MAX_DELTA_RATIO:
+                tiles = []
+                size = self.tile_size
+                for row, col in changed:
+                    y = int(row) * size
+                    x = int(col) * size
+                    tile = pixels[y:y + size, x:x + size]
+                    tiles.append((x, y, tile.shape[1], tile.shape[0], encode_jpeg(tile, self.quality)))
+                    self.previous[y:y + size, x:x + size] = tile
+                self.deltas += 1
+                self.tiles_sent += len(tiles)
+                return EncodedFrame(width, height, tiles=tiles)
+
+        # Full frame
+        jpeg = encode_jpeg(pixels, self.quality)
+        self.previous = pixels.copy()
+        self.last_keyframe = now
+        self.keyframe_requested = False
+        self.keyframes += 1
+        return EncodedFrame(width, height, jpeg=jpeg)
+
+class StreamEncoder:
+    """
+    Encodes captured frames on a worker pool and hands the result to a callback.
+
+    Each frame is encoded once per requested rendition (max width, JPEG quality),
+    and every rendition keeps its own delta state. Renditions that are no longer
+    requested are dropped together with their state.
+
+    At most `max_in_flight` frames are encoded at once. Frames submitted while the
+    pool is busy replace each other in a single pending slot, so only the newest
+    one is encoded, and frames that reach a rendition after a newer frame was
+    published are dropped instead of being sent out of order.
+    """
+
+    def __init__(self, on_encoded, workers=2, max_in_flight=2):
+        """
+        Initialize the encoder.
+
+        Args:
+            on_encoded (callable): Called as on_encoded(EncodedFrame) from a worker thread
+            workers (int): Number of encode threads
+            max_in_flight (int): Maximum number of frames being encoded at the same time
+        """
+        self.on_encoded = on_encoded
+        self.max_in_flight = max(1, max_in_flight)
+        self.renditions = {}  # (max_width, quality) -> DeltaEncoder
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="stream-encoder")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._pending = None
+        self._next_sequence = 0
+
+        # Counters
+        self.frames_submitted = 0
+        self.frames_encoded = 0
+        self.frames_dropped = 0
+
+    def request_keyframe(self, rendition=None):
+        """Make the next encoded frame of a rendition (or of all renditions) a full frame"""
+        with self._lock:
+            encoders = list(self.renditions.values()) if rendition is None else [self.renditions.get(rendition)]
+        for encoder in encoders:
+            if encoder is not None:
+                encoder.request_keyframe()
+
+    def submit(self, image: QImage, renditions):
+        """
+        Queue a snapshot for encoding. The encoder takes ownership of the image.
+
+        Args:
+            image (QImage): ARGB32 snapshot of the display
+            renditions (dict): (max_width, quality) -> whether delta tiles may be sent
+        """
+        with self._lock:
+            self._update_renditions(renditions)
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            self.frames_submitted += 1
+
+            if self._in_flight >= self.max_in_flight:
+                # Pool is saturated, keep only the newest frame
+                if self._pending is not None:
+                    self.frames_dropped += 1
+                self._pending = (sequence, image, dict(renditions))
+                return
+            self._in_flight += 1
+
+        self._executor.submit(self._encode, sequence, image, dict(renditions))
+
+    def drop_unused_renditions(self, renditions):
+        """Tear down the delta state of renditions no viewer watches any more (e.g. the last one left)"""
+        with self._lock:
+            self._drop_renditions(renditions)
+
+    def _drop_renditions(self, renditions):
+        for key in list(self.renditions):
+            if key not in renditions:
+                del self.renditions[key]
+
+    def _update_renditions(self, renditions):
+        """Create delta state for new renditions and tear down unused ones (lock held)"""
+        self._drop_renditions(renditions)
+        for key in renditions:
+            if key not in self.renditions:
+                self.renditions[key] = DeltaEncoder(quality=key[1])
+
+    def in_flight(self):
+        """Number of frames currently being encoded"""
+        with self._lock:
+            return self._in_flight
+
+    def _encode(self, sequence, image, renditions):
+        try:
+            pixels = qimage_to_array(image)
+            scaled = {}  # Shared between renditions of the same width
+
+            for key, allow_delta in renditions.items():
+                with self._lock:
+                    delta = self.renditions.get(key)
+                if delta is None:
+                    # Torn down while this frame was waiting
+                    continue
+
+                max_width = key[0]
+                if max_width not in scaled:
+                    scaled[max_width] = scale_to_width(pixels, max_width)
+
+                # Delta state must advance in order, so frames are diffed and published one at a time
+                with delta.lock:
+                    if sequence < delta.last_sequence:
+                        # A newer frame already went out
+                        self.frames_dropped += 1
+                        continue
+                    delta.last_sequence = sequence
+                    encoded = delta.encode(scaled[max_width], allow_delta)
+                    if encoded is not None:
+                        encoded.rendition = key
+                        self.frames_encoded += 1
+                        self.on_encoded(encoded)
+        except Exception as e:
+            print(f"Error encoding stream frame: {e}")
+        finally:
+            with self._lock:
+                pending = self._pending
+                self._pending = None
+                if pending is None:
+                    self._in_flight -= 1
+
+            # Reuse this in-flight slot for the newest pending frame
+            if pending is not None:
+                try:
+                    self._executor.submit(self._encode, *pending)
+                except RuntimeError:
+                    # Encoder was shut down
+                    pass
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        with self._lock:
+            self._pending = None
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,32 @@
+import threading
+
+from PyQt5.QtGui import QImage
+
+from stream_encoder import StreamEncoder
+
+def test_unused_renditions_are_dropped_without_a_new_frame():
+    encoded = []
+    done = threading.Event()
+
+    def on_encoded(frame):
+        encoded.append(frame.rendition)
+        if len(encoded) == 2:
+            done.set()
+
+    encoder = StreamEncoder(on_encoded, workers=1)
+    try:
+        image = QImage(320, 180, QImage.Format_ARGB32)
+        image.fill(0xFF336699)
+        encoder.submit(image, {(0, 85): True, (160, 50): True})
+        assert done.wait(5)
+        assert set(encoder.renditions) == {(0, 85), (160, 50)}
+
+        # The small rendition's viewer left and nothing else was submitted
+        encoder.drop_unused_renditions({(0, 85): True})
+        assert set(encoder.renditions) == {(0, 85)}
+
+        # The last viewer left
+        encoder.drop_unused_renditions({})
+        assert encoder.renditions == {}
+    finally:
+        encoder.shutdown()
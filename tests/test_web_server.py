@@ -0,0 +1,55 @@
+import asyncio
+
+import web_server
+from web_server import AdaptiveController, ClientConnection, PROTOCOL_BINARY, QUALITY_LADDER, StreamFrame
+
+class FakeWebSocket:
+    """Client that takes every message instantly"""
+    client = None
+
+    async def send_bytes(self, data):
+        pass
+
+    async def send_text(self, data):
+        pass
+
+async def stream_to_fast_client(connection, source_fps=30, seconds=1.5, report_interval=0.25):
+    """Offer frames at source_fps and send a good viewer report every report_interval"""
+    sender = asyncio.create_task(connection.run())
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    next_report = started + report_interval
+    sequence = 0
+    while loop.time() - started < seconds:
+        sequence += 1
+        tiles = None if connection.awaiting_keyframe else [(0, 0, 16, 16, b"tile")]
+        connection.offer(StreamFrame(b"jpeg", 640, 360, sequence, loop.time(), tiles=tiles,
+                                     rendition=connection.rendition))
+        if loop.time() >= next_report:
+            connection.handle_feedback({"decode_ms": 2, "fps": source_fps, "backlog": 0})
+            next_report += report_interval
+        await asyncio.sleep(1.0 / source_fps)
+    sender.cancel()
+    try:
+        await sender
+    except asyncio.CancelledError:
+        pass
+
+def test_fast_client_at_capped_level_steps_up(monkeypatch):
+    monkeypatch.setattr(AdaptiveController, "SETTLE_SECONDS", 0.0)
+    monkeypatch.setattr(web_server, "client_connected_callback", None)
+    monkeypatch.setattr(web_server, "connections_changed_callback", None)
+
+    # Level 2 caps at 25 fps, below the 30 fps source, so the slot keeps coalescing
+    max_width, quality, fps = QUALITY_LADDER[2]
+    assert fps < 30
+    connection = ClientConnection(1, FakeWebSocket(), PROTOCOL_BINARY, rendition=(max_width, quality),
+                                  adaptive=True)
+    assert connection.adaptive.level == 2
+
+    asyncio.run(stream_to_fast_client(connection))
+
+    assert connection.frames_dropped == 0
+    assert connection.frames_merged > 0
+    assert connection.adaptive.level < 2
+    assert all(change["direction"] == "up" for change in connection.adaptive.history)
@@ -0,0 +1,926 @@
+import os
+import sys
+import abc
+import time
+import ctypes
+import threading
+from pathlib import Path
+import numpy as np
+import cv2
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QImage
+
+class NDIlib_frame_type:
+    NONE = 0
+    VIDEO = 1
+    AUDIO = 2
+    METADATA = 3
+    ERROR = 4
+    STATUS_CHANGE = 100
+
+class NDIlib_recv_color_format:
+    BGRX_BGRA = 0
+    UYVY_BGRA = 1  # UYVY when the source is opaque, BGRA when it has alpha
+    
+class NDIlib_recv_bandwidth:
+    LOWEST = 0  # The sender's low resolution proxy stream
+    HIGHEST = 100
+    
+NDI_FOURCC_UYVY = 0x59565955  # 'UYVY'
+NDI_TIMESTAMP_UNDEFINED = 0x7FFFFFFFFFFFFFFF  # Sender did not provide a timestamp (100 ns units otherwise)
+
+# Switch to the proxy stream when the NDI picture is shown at less than a third of
+# the source width, and back to full resolution above 40% (so resizing doesn't flap)
+NDI_PROXY_ENTER_RATIO = 1 / 3
+NDI_PROXY_EXIT_RATIO = 0.4
+
+# Unchanged frames are detected from every STATIC_SAMPLE_STEP-th row and column, and
+# a frame is passed on at least every STATIC_REFRESH_INTERVAL seconds anyway, so a
+# change that falls between the sampled pixels still shows up
+STATIC_SAMPLE_STEP = 4
+STATIC_REFRESH_INTERVAL = 1.0
+
+# NDI sends SD video in BT.601 colors and HD and up in BT.709
+NDI_BT709_MIN_HEIGHT = 720
+
+def yuv_to_bgr_matrix(kr, kb):
+    """
+    cv2.transform matrix from limited range (Y, U, V) to (B, G, R) for the given luma weights.
+
+    Args:
+        kr (float): Red weight (0.2126 for BT.709, 0.299 for BT.601)
+        kb (float): Blue weight (0.0722 for BT.709, 0.114 for BT.601)
+    """
+    kg = 1.0 - kr - kb
+    y = 255.0 / 219.0
+    c = 255.0 / 224.0
+    matrix = np.array([
+        [y, 2.0 * (1.0 - kb) * c, 0.0, 0.0],
+        [y, -2.0 * (1.0 - kb) * kb / kg * c, -2.0 * (1.0 - kr) * kr / kg * c, 0.0],
+        [y, 0.0, 2.0 * (1.0 - kr) * c, 0.0],
+    ], dtype=np.float32)
+    # Offsets for the 16 (luma) and 128 (chroma) zero points
+    matrix[:, 3] = -(matrix[:, 0] * 16.0 + (matrix[:, 1] + matrix[:, 2]) * 128.0)
+    return matrix
+
+BT709_YUV_TO_BGR = yuv_to_bgr_matrix(0.2126, 0.0722)
+# cv2.mixChannels pairs turning a UYVY pixel pair (U, Y0, V, Y1) into (Y0, U, V, Y1, U, V)
+UYVY_TO_YUV_PAIRS = [1, 0, 0, 1, 2, 2, 3, 3, 0, 4, 2, 5]
+
+def address_array(data, width, height, stride, channels):
+    """View `height` lines of pixels at address `data` as a (height, width, channels) array without copying"""
+    pixels = np.frombuffer((ctypes.c_ubyte * (stride * height)).from_address(data), dtype=np.uint8)
+    return pixels.reshape(height, stride)[:, :width * channels].reshape(height, width, channels)
+    
+class NDIlib_source_t(ctypes.Structure):
+    _fields_ = [
+        ("p_ndi_name", ctypes.c_char_p),
+        ("p_url_address", ctypes.c_char_p)
+    ]
+    
+class NDIlib_find_create_t(ctypes.Structure):
+    _fields_ = [
+        ("show_local_sources", ctypes.c_bool),
+        ("p_groups", ctypes.c_char_p),
+        ("p_extra_ips", ctypes.c_char_p)
+    ]
+    
+class NDIlib_recv_create_v3_t(ctypes.Structure):
+    _fields_ = [
+        ("source_to_connect_to", NDIlib_source_t),
+        ("color_format", ctypes.c_int),
+        ("bandwidth", ctypes.c_int),
+        ("allow_video_fields", ctypes.c_bool),
+        ("p_ndi_recv_name", ctypes.c_char_p)
+    ]
+    
+class NDIlib_video_frame_v2_t(ctypes.Structure):
+    _fields_ = [
+        ("xres", ctypes.c_int),
+        ("yres", ctypes.c_int),
+        ("FourCC", ctypes.c_int),
+        ("frame_rate_N", ctypes.c_int),
+        ("frame_rate_D", ctypes.c_int),
+        ("picture_aspect_ratio", ctypes.c_float),
+        ("frame_format_type", ctypes.c_int),
+        ("timecode", ctypes.c_longlong),
+        ("p_data", ctypes.c_void_p),
+        ("line_stride_in_bytes", ctypes.c_int),
+        ("p_metadata", ctypes.c_char_p),
+        ("timestamp", ctypes.c_longlong)
+    ]
+
+class FramePool:
+    """
+    Reusable frame images, so received video frames don't allocate memory.
+
+    Frames are handed out as shallow QImage copies. A pooled image is written
+    again only once all copies are gone, which QImage's own reference count
+    tells us (isDetached), so a frame that is still shown is never overwritten.
+    """
+
+    def __init__(self, max_frames=6):
+        # Room for the shown frame, the frame pacer's queue (up to 3) and the one being received
+        self.max_frames = max_frames
+        self.images = []
+        self._yuv = None  # Buffers for BT.709 conversion
+        self._bgr = None
+        
+        # Counters
+        self.allocations = 0  # Pooled images created
+        self.reuses = 0
+        self.overflows = 0  # Frames copied outside the pool because every image was in use
+        
+    def _acquire(self, width, height):
+        size = QSize(width, height)
+        for image in self.images:
+            if image.isDetached() and image.size() == size:
+                self.reuses += 1
+                return image
+                
+        # Forget unused images of another size (the source changed resolution)
+        self.images = [image for image in self.images if image.size() == size or not image.isDetached()]
+        if len(self.images) >= self.max_frames:
+            return None
+        image = QImage(width, height, QImage.Format_ARGB32)
+        self.images.append(image)
+        self.allocations += 1
+        return image
+        
+    def copy_frame(self, data, width, height, stride):
+        """Copy BGRA pixels at address `data` into a pooled image and return a shallow copy of it"""
+        image = self._acquire(width, height)
+        if image is None:
+            self.overflows += 1
+            image = QImage(width, height, QImage.Format_ARGB32)
+            
+        target = int(image.bits())
+        line = image.bytesPerLine()
+        if stride == line:
+            ctypes.memmove(target, data, line * height)
+        else:
+            for row in range(height):
+                ctypes.memmove(target + row * line, data + row * stride, min(line, stride))
+        return QImage(image)
+        
+    def _acquire_array(self, width, height):
+        """Pooled image for a frame and a (height, width, 4) array view of its pixels"""
+        image = self._acquire(width, height)
+        if image is None:
+            self.overflows += 1
+            image = QImage(width, height, QImage.Format_ARGB32)
+        bits = image.bits()
+        bits.setsize(image.sizeInBytes())
+        pixels = np.frombuffer(bits, dtype=np.uint8).reshape(height, image.bytesPerLine())
+        return image, pixels[:, :width * 4].reshape(height, width, 4)
+        
+    def convert_uyvy(self, data, width, height, stride):
+        """Convert UYVY pixels at address `data` to BGRA in a pooled image and return a shallow copy of it"""
+        pixels = address_array(data, width, height, stride, 2)
+        if height < NDI_BT709_MIN_HEIGHT:
+            # OpenCV uses BT.601 coefficients
+            return self.convert_array(pixels, cv2.COLOR_YUV2BGRA_UYVY)
+            
+        # BT.709: give both pixels of each pair their shared chroma (UYVY -> YUV YUV),
+        # apply the matrix, then add alpha straight into the pooled image
+        if self._yuv is None or self._yuv.shape != (height, width, 3):
+            self._yuv = np.empty((height, width, 3), dtype=np.uint8)
+            self._bgr = np.empty((height, width, 3), dtype=np.uint8)
+        pairs = np.ascontiguousarray(pixels).reshape(height, width // 2, 4)
+        cv2.mixChannels([pairs], [self._yuv.reshape(height, width // 2, 6)], UYVY_TO_YUV_PAIRS)
+        cv2.transform(self._yuv, BT709_YUV_TO_BGR, dst=self._bgr)
+        image, target = self._acquire_array(width, height)
+        cv2.cvtColor(self._bgr, cv2.COLOR_BGR2BGRA, dst=target)
+        return QImage(image)
+        
+    def convert_array(self, pixels, code):
+        """Convert an array with cv2.cvtColor straight into a pooled BGRA image and return a shallow copy of it"""
+        image, target = self._acquire_array(pixels.shape[1], pixels.shape[0])
+        cv2.cvtColor(pixels, code, dst=target)
+        return QImage(image)
+        
+    def copy_array(self, pixels):
+        """Copy a (height, width, 4) BGRA array into a pooled image and return a shallow copy of it"""
+        image, target = self._acquire_array(pixels.shape[1], pixels.shape[0])
+        np.copyto(target, pixels)
+        return QImage(image)
+        
+    def stats(self):
+        return {
+            'frames': len(self.images),
+            'bytes': sum(image.sizeInBytes() for image in self.images),
+            'allocations': self.allocations,
+            'reuses': self.reuses,
+            'overflows': self.overflows,
+        }
+
+class VideoSource(abc.ABC):
+    """
+    Background video input feeding the display.
+
+    A capture thread calls receive_frame() in a loop and keeps only the newest
+    frame in a slot that the display empties with take_frame(). Subclasses
+    implement receive_frame() (and initialize() when opening can fail); frames
+    are QImages from the source's FramePool, so they don't allocate memory.
+    """
+    name = "Video"
+    
+    def __init__(self):
+        self.frame_pool = FramePool()
+        self.display_size = None  # (width, height) the frames are shown at
+        
+        # Pacing for sources that don't block until their next frame (0 = as fast as possible)
+        self.frame_interval = 0.0
+        self._next_due = None
+        
+        # Timing of the source, for frame pacing
+        self.frame_rate = 0.0  # Nominal frames per second (0 = unknown)
+        self.frame_timestamp = None  # Source time of the last received frame in seconds (None = unknown)
+        
+        # Unchanged frames (slides, holding graphics) are dropped before they are copied
+        self.skip_static = True
+        self.frames_static = 0
+        self.static_fps = 0.0
+        self._signature = None
+        self._signature_time = 0.0
+        self._fps_static = 0
+        
+        # Capture thread
+        self.capture_timeout_ms = 100  # How long one receive call blocks waiting for a frame
+        self.on_frame = None
+        self._capture_thread = None
+        self._capturing = False
+        self._frame_lock = threading.Lock()
+        self._latest = None  # (QImage, capture time, source timestamp) not yet taken by the display
+        
+        # Statistics
+        self.frames_received = 0
+        self.frames_dropped = 0  # Replaced in the slot before the display took them
+        self.fps = 0.0
+        self.latency_ms = 0.0  # Capture to paint, smoothed
+        self._fps_frames = 0
+        self._fps_start = time.monotonic()
+        
+    def initialize(self):
+        """Open the source. Returns False if it is not available."""
+        return True
+        
+    def is_connected(self):
+        """Whether receive_frame() can deliver frames right now"""
+        return True
+        
+    @abc.abstractmethod
+    def receive_frame(self, timeout_ms=0):
+        """Return the next frame as a QImage, waiting up to timeout_ms for it, or None"""
+        
+    def set_display_size(self, width, height):
+        """Size of the area the frames are shown in"""
+        self.display_size = (width, height)
+        
+    def _frame_received(self, frame):
+        """Called on the capture thread after each frame"""
+        pass
+        
+    def _is_static(self, pixels):
+        """
+        Check whether a frame looks the same as the previous one, from a downsampled hash.
+
+        Args:
+            pixels (np.ndarray): (height, width, channels) view of the received frame
+
+        Returns:
+            bool: True if the frame can be skipped
+        """
+        if not self.skip_static:
+            return False
+        sample = pixels[::STATIC_SAMPLE_STEP, ::STATIC_SAMPLE_STEP]
+        signature = (pixels.shape, hash(sample.tobytes()))
+        now = time.monotonic()
+        if signature == self._signature and now - self._signature_time < STATIC_REFRESH_INTERVAL:
+            self.frames_static += 1
+            self._fps_static += 1
+            return True
+        self._signature = signature
+        self._signature_time = now
+        return False
+        
+    def _wait_for_next_frame(self, timeout_ms):
+        """Sleep until the next frame is due. Returns False if that is more than timeout_ms away."""
+        if not self.frame_interval:
+            return True
+        now = time.monotonic()
+        if self._next_due is None or now - self._next_due > self.frame_interval:
+            # Fell behind by more than a frame, don't try to catch up
+            self._next_due = now
+        wait = self._next_due - now
+        if wait > timeout_ms / 1000.0:
+            time.sleep(timeout_ms / 1000.0)
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        self._next_due += self.frame_interval
+        return True
+        
+    def start_capture(self, on_frame=None):
+        """
+        Start capturing frames on a background thread.
+
+        Args:
+            on_frame (callable): Called from the capture thread after each new frame;
+                                 collect it with take_frame()
+        """
+        self.on_frame = on_frame
+        if self._capture_thread and self._capture_thread.is_alive():
+            return
+        self._capturing = True
+        self._signature = None
+        self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True, name="ndi-capture")
+        self._capture_thread.start()
+        
+    def stop_capture(self):
+        """Stop the capture thread"""
+        self._capturing = False
+        if self._capture_thread and self._capture_thread is not threading.current_thread():
+            self._capture_thread.join(timeout=1.0)
+        self._capture_thread = None
+        with self._frame_lock:
+            self._latest = None
+            
+    def _capture_loop(self):
+        while self._capturing:
+            if not self.is_connected():
+                # Not connected to a source yet
+                time.sleep(0.05)
+                continue
+                
+            try:
+                self.frame_timestamp = None
+                frame = self.receive_frame(self.capture_timeout_ms)
+            except Exception as e:
+                print(f"Error receiving {self.name} frame: {e}")
+                frame = None
+                time.sleep(self.capture_timeout_ms / 1000.0)
+            now = time.monotonic()
+            
+            with self._frame_lock:
+                if frame is not None:
+                    if self._latest is not None:
+                        self.frames_dropped += 1
+                    self._latest = (frame, now, self.frame_timestamp)
+                    self.frames_received += 1
+                    self._fps_frames += 1
+                elapsed = now - self._fps_start
+                if elapsed >= 1.0:
+                    self.fps = self._fps_frames / elapsed
+                    self.static_fps = self._fps_static / elapsed
+                    self._fps_frames = 0
+                    self._fps_static = 0
+                    self._fps_start = now
+                    
+            if frame is not None and self.on_frame is not None:
+                try:
+                    self.on_frame()
+                except Exception as e:
+                    print(f"Error delivering {self.name} frame: {e}")
+                    
+            if frame is not None:
+                self._frame_received(frame)
+                
+    def take_frame(self):
+        """Return the newest captured (QImage, capture time, source timestamp) and clear the slot, or None"""
+        with self._frame_lock:
+            latest = self._latest
+            self._latest = None
+        return latest
+        
+    def record_paint(self, captured):
+        """Note that a frame captured at `captured` (time.monotonic) was painted"""
+        latency_ms = (time.monotonic() - captured) * 1000.0
+        self.latency_ms = latency_ms if self.latency_ms == 0.0 else self.latency_ms * 0.9 + latency_ms * 0.1
+        
+    def stats(self):
+        with self._frame_lock:
+            return {
+                'fps': round(self.fps, 1),
+                'frames': self.frames_received,
+                'dropped': self.frames_dropped,
+                'static': self.frames_static,
+                'static_fps': round(self.static_fps, 1),
+                'latency_ms': round(self.latency_ms, 1),
+                'pool': self.frame_pool.stats(),
+            }
+        
+    def cleanup(self):
+        """Stop capturing and release the source"""
+        self.stop_capture()
+        
+def ndi_library_paths():
+    """Places to look for the NDI runtime library on this platform"""
+    # The NDI installers point these at the runtime folder
+    runtime_dirs = [os.environ[name] for name in ("NDI_RUNTIME_DIR_V6", "NDI_RUNTIME_DIR_V5") if os.environ.get(name)]
+    if sys.platform == "win32":
+        return [Path(folder) / "Processing.NDI.Lib.x64.dll" for folder in runtime_dirs] + [
+            Path("C:/Program Files/NDI/NDI 6 Runtime/v6/Processing.NDI.Lib.x64.dll"),
+            Path("C:/Program Files/NDI/NDI 6 SDK/Lib/x64/Processing.NDI.Lib.x64.dll"),
+            Path("C:/Program Files/NDI/NDI 5 Runtime/Processing.NDI.Lib.x64.dll"),
+            Path("C:/Program Files/NDI/NDI 5 SDK/Lib/x64/Processing.NDI.Lib.x64.dll"),
+            Path("Processing.NDI.Lib.x64.dll")
+        ]
+    if sys.platform == "darwin":
+        return [Path(folder) / "libndi.dylib" for folder in runtime_dirs] + [
+            Path("/Library/NDI SDK for Apple/lib/macOS/libndi.dylib"),
+            Path("/usr/local/lib/libndi.dylib"),
+            Path("libndi.dylib")
+        ]
+    return [Path(folder) / "libndi.so" for folder in runtime_dirs] + [
+        Path("libndi.so.6"),
+        Path("libndi.so.5"),
+        Path("libndi.so")
+    ]
+    
+class NDIReceiver(VideoSource):
+    """Receives a source from the network with the NDI SDK"""
+    name = "NDI"
+    
+    def __init__(self):
+        super().__init__()
+        self.ndi = None
+        self.finder = None
+        self.receiver = None
+        self.video_frame = None
+        self.current_source = None
+        self.sources = []  # Names of the sources discovered so far
+        self.source_info = {}  # name -> (name bytes, url bytes), enough to connect without a re-scan
+        self.wanted_source = None  # Name of the source to (re)connect to
+        self._sources_lock = threading.Lock()
+        
+        # Receive format. BGRA is copied as-is; UYVY takes half the network bandwidth
+        # but costs a conversion on the capture thread (about 8 ms per 1080p frame)
+        self.color_format = NDIlib_recv_color_format.BGRX_BGRA
+        self.bandwidth = NDIlib_recv_bandwidth.HIGHEST
+        self.auto_bandwidth = True  # Use the proxy stream when the picture is shown much smaller
+        self.source_size = None  # Full resolution of the current source
+        self._video_frame = NDIlib_video_frame_v2_t()  # Reused by every capture call
+        
+        self._receiver_lock = threading.Lock()  # Receiver must not be replaced during a capture
+        
+        # Discovery thread
+        self.discovery_timeout_ms = 1000  # How long one wait for source changes blocks
+        self.on_sources_changed = None
+        self._discovery_thread = None
+        self._discovering = False
+        self._wanted_lost = False
+        
+    def initialize(self):
+        if self.finder:
+            # Already initialized
+            return True
+            
+        # Load NDI library - try multiple possible paths
+        for path in ndi_library_paths():
+            try:
+                print(f"Trying NDI path: {path}")
+                if sys.platform == "win32":
+                    if path.exists():
+                        self.ndi = ctypes.WinDLL(str(path))
+                elif path.parent != Path(".") and not path.exists():
+                    continue
+                else:
+                    # Bare library names are looked up by the dynamic loader
+                    self.ndi = ctypes.CDLL(str(path))
+                if self.ndi:
+                    print(f"Successfully loaded NDI from: {path}")
+                    break
+            except Exception as e:
+                print(f"Error loading {path}: {e}")
+                continue
+                
+        if not self.ndi:
+            print("Failed to initialize NDI: Could not find NDI Runtime. Please make sure NDI Runtime is installed.")
+            return False
+            
+        # Set up function signatures
+        self.ndi.NDIlib_initialize.restype = ctypes.c_bool
+        
+        self.ndi.NDIlib_find_create_v2.argtypes = [ctypes.POINTER(NDIlib_find_create_t)]
+        self.ndi.NDIlib_find_create_v2.restype = ctypes.c_void_p
+        
+        self.ndi.NDIlib_find_get_current_sources.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint32)]
+        self.ndi.NDIlib_find_get_current_sources.restype = ctypes.POINTER(NDIlib_source_t)
+        
+        self.ndi.NDIlib_find_wait_for_sources.argtypes = [ctypes.c_void_p, ctypes.c_uint32]
+        self.ndi.NDIlib_find_wait_for_sources.restype = ctypes.c_bool
+        
+        self.ndi.NDIlib_recv_create_v3.argtypes = [ctypes.POINTER(NDIlib_recv_create_v3_t)]
+        self.ndi.NDIlib_recv_create_v3.restype = ctypes.c_void_p
+        
+        self.ndi.NDIlib_recv_destroy.argtypes = [ctypes.c_void_p]
+        self.ndi.NDIlib_recv_destroy.restype = None
+        
+        self.ndi.NDIlib_find_destroy.argtypes = [ctypes.c_void_p]
+        self.ndi.NDIlib_find_destroy.restype = None
+        
+        print("Initializing NDI...")
+        if not self.ndi.NDIlib_initialize():
+            print("Failed to initialize NDI library")
+            return False
+            
+        print("Creating NDI finder...")
+        find_create = NDIlib_find_create_t(show_local_sources=True, p_groups=None, p_extra_ips=None)
+        self.finder = self.ndi.NDIlib_find_create_v2(ctypes.byref(find_create))
+        if not self.finder:
+            print("Failed to create NDI finder")
+            return False
+            
+        print("NDI initialized successfully")
+        return True
+        
+    def find_sources(self):
+        """Names of the sources discovered so far (discovery runs in the background)"""
+        with self._sources_lock:
+            return list(self.sources)
+            
+    def start_discovery(self, on_sources_changed=None):
+        """
+        Watch the network for sources on a background thread.
+        
+        Args:
+            on_sources_changed (callable): Called from the discovery thread as
+                                           on_sources_changed(added_names, removed_names)
+        """
+        self.on_sources_changed = on_sources_changed
+        if self._discovery_thread and self._discovery_thread.is_alive():
+            return
+        # Start from an empty list so every known source is reported as added
+        with self._sources_lock:
+            self.sources = []
+            self.source_info = {}
+        self._discovering = True
+        self._discovery_thread = threading.Thread(target=self._discovery_loop, daemon=True, name="ndi-discovery")
+        self._discovery_thread.start()
+        
+    def stop_discovery(self):
+        """Stop the discovery thread"""
+        self._discovering = False
+        if self._discovery_thread and self._discovery_thread is not threading.current_thread():
+            self._discovery_thread.join(timeout=self.discovery_timeout_ms / 1000.0 + 1.0)
+        self._discovery_thread = None
+        
+    def _discovery_loop(self):
+        first = True
+        while self._discovering:
+            if not self.finder:
+                return
+            # Blocks until the source list changes or the timeout passes
+            changed = self.ndi.NDIlib_find_wait_for_sources(ctypes.c_void_p(self.finder), self.discovery_timeout_ms)
+            if changed or first:
+                first = False
+                try:
+                    self._refresh_sources()
+                except Exception as e:
+                    print(f"Error discovering NDI sources: {e}")
+                    
+    def _refresh_sources(self):
+        """Read the current source list and report what was added and removed"""
+        num_sources = ctypes.c_uint32(0)
+        sources_ptr = self.ndi.NDIlib_find_get_current_sources(ctypes.c_void_p(self.finder), ctypes.byref(num_sources))
+        found = {}
+        for i in range(num_sources.value if sources_ptr else 0):
+            source = sources_ptr[i]
+            if not source.p_ndi_name:
+                continue
+            # Copy the strings out, the SDK only keeps the array until the next query
+            found[source.p_ndi_name.decode('utf-8')] = (source.p_ndi_name, source.p_url_address)
+            
+        with self._sources_lock:
+            added = [name for name in found if name not in self.source_info]
+            removed = [name for name in self.source_info if name not in found]
+            self.source_info = found
+            self.sources = list(found)
+        if not added and not removed:
+            return
+            
+        for name in added:
+            print(f"Found NDI source: {name}")
+        for name in removed:
+            print(f"NDI source gone: {name}")
+        if self.on_sources_changed is not None:
+            self.on_sources_changed(added, removed)
+            
+        # Reconnect when the chosen source comes back
+        if self.wanted_source in removed:
+            self._wanted_lost = True
+        elif self.wanted_source in added and (self._wanted_lost or not self.receiver):
+            self._wanted_lost = False
+            self.connect_to_source(self.wanted_source)
+            
+    def connect_to_source(self, source):
+        """Connect to a source by name, or by its index in the discovered list"""
+        with self._sources_lock:
+            if isinstance(source, int):
+                if not 0 <= source < len(self.sources):
+                    print(f"Invalid source index: {source}")
+                    return False
+                source = self.sources[source]
+            self.wanted_source = source
+            info = self.source_info.get(source)
+            
+        if info is None:
+            print(f"NDI source not available, will connect when it appears: {source}")
+            return False
+        if source != self.current_source:
+            # Full resolution of a new source is learned from its first frames
+            self.source_size = None
+            self.bandwidth = NDIlib_recv_bandwidth.HIGHEST
+        self._signature = None
+            
+        try:
+            # Clean up existing receiver
+            with self._receiver_lock:
+                if self.receiver:
+                    self.ndi.NDIlib_recv_destroy(ctypes.c_void_p(self.receiver))
+                    self.receiver = None
+                    self.current_source = None  # Clear current source reference
+                    
+            # Create receiver description
+            recv_desc = NDIlib_recv_create_v3_t()
+            recv_desc.source_to_connect_to = NDIlib_source_t(info[0], info[1])
+            recv_desc.color_format = self.color_format
+            recv_desc.bandwidth = self.bandwidth
+            recv_desc.allow_video_fields = False
+            recv_desc.p_ndi_recv_name = None
+            
+            # Create receiver with proper error handling
+            try:
+                receiver = self.ndi.NDIlib_recv_create_v3(ctypes.byref(recv_desc))
+                if not receiver:
+                    print("Failed to create receiver")
+                    return False
+                    
+                # Store receiver and current source name
+                with self._receiver_lock:
+                    self.receiver = receiver
+                    self.current_source = source
+                print(f"Connected to NDI source: {source}")
+                return True
+                
+            except Exception as e:
+                print(f"Failed to create receiver: {e}")
+                return False
+                
+        except Exception as e:
+            print(f"Error connecting to source: {e}")
+            return False
+
+    def is_connected(self):
+        return self.receiver is not None
+        
+    def receive_frame(self, timeout_ms=0):
+        """Receive a frame from NDI source, waiting up to timeout_ms for one"""
+        with self._receiver_lock:
+            if not self.receiver or self.current_source is None:
+                return None
+            return self._capture(timeout_ms)
+            
+    def _capture(self, timeout_ms):
+        video_frame = self._video_frame
+        if self.ndi.NDIlib_recv_capture_v2(ctypes.c_void_p(self.receiver), ctypes.byref(video_frame), None, None, timeout_ms) == NDIlib_frame_type.VIDEO:
+            try:
+                uyvy = video_frame.FourCC == NDI_FOURCC_UYVY
+                if self._is_static(address_array(video_frame.p_data, video_frame.xres, video_frame.yres,
+                                                 video_frame.line_stride_in_bytes, 2 if uyvy else 4)):
+                    # Same picture as before, nothing to copy, scale or repaint
+                    self.ndi.NDIlib_recv_free_video_v2(ctypes.c_void_p(self.receiver), ctypes.byref(video_frame))
+                    return None
+                    
+                # Copy the frame into a reused image, then hand the buffer back to NDI
+                if uyvy:
+                    image = self.frame_pool.convert_uyvy(video_frame.p_data, video_frame.xres, video_frame.yres,
+                                                         video_frame.line_stride_in_bytes)
+                else:
+                    image = self.frame_pool.copy_frame(video_frame.p_data, video_frame.xres, video_frame.yres,
+                                                       video_frame.line_stride_in_bytes)
+                if video_frame.frame_rate_N > 0 and video_frame.frame_rate_D > 0:
+                    self.frame_rate = video_frame.frame_rate_N / video_frame.frame_rate_D
+                if video_frame.timestamp != NDI_TIMESTAMP_UNDEFINED:
+                    self.frame_timestamp = video_frame.timestamp / 1e7
+                self.ndi.NDIlib_recv_free_video_v2(ctypes.c_void_p(self.receiver), ctypes.byref(video_frame))
+                
+                return image
+            except Exception as e:
+                print(f"Error receiving NDI frame: {e}")
+                self.ndi.NDIlib_recv_free_video_v2(ctypes.c_void_p(self.receiver), ctypes.byref(video_frame))
+                return None
+        return None
+        
+    def set_color_format(self, color_format):
+        """Receive BGRA or UYVY frames (NDIlib_recv_color_format), reconnecting if needed"""
+        if color_format != self.color_format:
+            self.color_format = color_format
+            if self.current_source is not None:
+                self.connect_to_source(self.current_source)
+                
+    def _frame_received(self, frame):
+        self._update_bandwidth(frame.width(), frame.height())
+        
+    def _update_bandwidth(self, width, height):
+        """Switch between the full and the proxy stream depending on the shown size"""
+        if self.bandwidth == NDIlib_recv_bandwidth.HIGHEST:
+            self.source_size = (width, height)
+        if not self.source_size or not self.display_size:
+            return
+            
+        source_width, source_height = self.source_size
+        display_width, display_height = self.display_size
+        shown_width = min(display_width, display_height * source_width / source_height)
+        bandwidth = self.bandwidth
+        if not self.auto_bandwidth:
+            bandwidth = NDIlib_recv_bandwidth.HIGHEST
+        elif shown_width < source_width * NDI_PROXY_ENTER_RATIO:
+            bandwidth = NDIlib_recv_bandwidth.LOWEST
+        elif shown_width > source_width * NDI_PROXY_EXIT_RATIO:
+            bandwidth = NDIlib_recv_bandwidth.HIGHEST
+            
+        if bandwidth != self.bandwidth and self.current_source is not None:
+            self.bandwidth = bandwidth
+            kind = "proxy" if bandwidth == NDIlib_recv_bandwidth.LOWEST else "full resolution"
+            print(f"Switching NDI source to the {kind} stream ({shown_width:.0f} of {source_width} pixels shown)")
+            self.connect_to_source(self.current_source)
+            
+    def stats(self):
+        stats = super().stats()
+        stats['proxy'] = self.bandwidth == NDIlib_recv_bandwidth.LOWEST
+        return stats
+        
+    def cleanup(self):
+        """Clean up NDI resources"""
+        self.stop_capture()
+        self.stop_discovery()
+        if self.receiver:
+            try:
+                self.ndi.NDIlib_recv_destroy(ctypes.c_void_p(self.receiver))
+            except:
+                pass
+            self.receiver = None
+            
+        if self.finder:
+            try:
+                self.ndi.NDIlib_find_destroy(ctypes.c_void_p(self.finder))
+            except:
+                pass
+            self.finder = None
+            
+        if self.ndi:
+            try:
+                self.ndi.NDIlib_destroy()
+            except:
+                pass
+            self.ndi = None
+            
+    def __del__(self):
+        self.cleanup()
+
+
+class OpenCVSource(VideoSource):
+    """Plays a video file (looping) or a capture device through OpenCV's VideoCapture"""
+    name = "Video"
+    
+    def __init__(self, source, loop=True):
+        """
+        Initialize the source.
+
+        Args:
+            source (str or int): Video file path or capture device index
+            loop (bool): Start a file over when it ends
+        """
+        super().__init__()
+        self.source = source
+        self.loop = loop
+        self.capture = None
+        self._bgr = None  # Decoded frame, reused by every read
+        
+    def initialize(self):
+        if self.capture is not None:
+            return True
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            print(f"Could not open video source: {self.source}")
+            return False
+        self.capture = capture
+        
+        # Capture devices block until their next frame, files are paced at their frame rate
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        if fps > 0:
+            self.frame_rate = fps
+        if not isinstance(self.source, int) and fps > 0:
+            self.frame_interval = 1.0 / fps
+        print(f"Opened video source: {self.source} ({fps:.2f} fps)")
+        return True
+        
+    def is_connected(self):
+        return self.capture is not None
+        
+    def receive_frame(self, timeout_ms=0):
+        if not self._wait_for_next_frame(timeout_ms):
+            return None
+        ok, frame = self.capture.read(self._bgr)
+        if not ok and self.loop and not isinstance(self.source, int):
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read(self._bgr)
+        if not ok:
+            # End of the file or the device went away
+            time.sleep(timeout_ms / 1000.0)
+            return None
+        self._bgr = frame
+        if self._is_static(frame if frame.ndim == 3 else frame[:, :, np.newaxis]):
+            return None
+        if not isinstance(self.source, int):
+            # Position in the file, so pacing follows the file's own timing
+            self.frame_timestamp = self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if frame.ndim == 2:
+            return self.frame_pool.convert_array(frame, cv2.COLOR_GRAY2BGRA)
+        return self.frame_pool.convert_array(frame, cv2.COLOR_BGR2BGRA)
+        
+    def cleanup(self):
+        super().cleanup()
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+            
+class SyntheticSource(VideoSource):
+    """
+    Generates a moving test pattern, for measuring the video path without a real source.
+
+    The pattern is drawn once, wider than the frame, and every frame copies a
+    shifted window of it, so producing a frame costs one copy.
+    """
+    name = "Synthetic"
+    
+    def __init__(self, width=1920, height=1080, fps=60.0, moving=True):
+        """
+        Initialize the source.
+
+        Args:
+            width (int): Frame width in pixels
+            height (int): Frame height in pixels
+            fps (float): Frame rate (0 = as fast as the display takes them)
+            moving (bool): Move the pattern (False sends the same picture, like a slide)
+        """
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.frame_interval = 1.0 / fps if fps > 0 else 0.0
+        self.frame_rate = fps
+        self.period = 256  # Pattern repeats every this many pixels horizontally
+        self.step = 8 if moving else 0  # Pixels the pattern moves per frame
+        self.frames_generated = 0
+        
+        x = np.arange(width + self.period) % self.period
+        y = np.arange(height) * 255 // max(1, height - 1)
+        self.pattern = np.empty((height, width + self.period, 4), dtype=np.uint8)
+        self.pattern[:, :, 0] = x[np.newaxis, :]
+        self.pattern[:, :, 1] = y[:, np.newaxis]
+        self.pattern[:, :, 2] = 255 - x[np.newaxis, :]
+        self.pattern[:, :, 3] = 255
+        
+    def receive_frame(self, timeout_ms=0):
+        if not self._wait_for_next_frame(timeout_ms):
+            return None
+        offset = self.frames_generated * self.step % self.period
+        if self.frame_interval:
+            # Ideal cadence, as if from a perfect clock
+            self.frame_timestamp = self.frames_generated * self.frame_interval
+        self.frames_generated += 1
+        pixels = self.pattern[:, offset:offset + self.width]
+        if self._is_static(pixels):
+            return None
+        return self.frame_pool.copy_array(pixels)
+        
+def open_video_source(spec):
+    """
+    Create and open a video source from a command line style description.
+
+    Args:
+        spec (str): "synthetic[:WIDTHxHEIGHT[@FPS]]", a capture device index, or a video file path
+
+    Returns:
+        VideoSource, or None if it could not be opened
+    """
+    if spec.startswith("synthetic"):
+        width, height, fps = 1920, 1080, 60.0
+        try:
+            options = spec.partition(":")[2]
+            if options:
+                size, _, rate = options.partition("@")
+                width, height = (int(value) for value in size.lower().split("x"))
+                if rate:
+                    fps = float(rate)
+        except ValueError:
+            print(f"Invalid synthetic source {spec!r}, expected synthetic:WIDTHxHEIGHT@FPS")
+            return None
+        source = SyntheticSource(width, height, fps)
+    else:
+        source = OpenCVSource(int(spec) if spec.isdigit() else spec)
+    if not source.initialize():
+        return None
+    return source
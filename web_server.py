@@ -1,5 +1,5 @@
-from fastapi import FastAPI, WebSocket
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, WebSocket, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import asyncio
 from pathlib import Path
@@ -7,18 +7,541 @@ import base64
 from io import BytesIO
 from PIL import Image
 import json
-from typing import Optional, Dict
-from queue import Queue
+import struct
+import time
+import itertools
+from collections import deque
+from typing import Optional, Dict, List, Tuple
 import threading
 
 app = FastAPI()
 
+# Binary frame protocol: a fixed little-endian header followed by the payload.
+# Fields: version, message type, flags, sequence, timestamp (ms), x, y, width, height
+# MSG_FULL_FRAME payload: the JPEG bytes
+# MSG_DELTA_FRAME payload: uint16 tile count, then per tile TILE_HEADER + JPEG bytes
+FRAME_HEADER = struct.Struct("<BBHIdHHHH")
+TILE_HEADER = struct.Struct("<HHHHI")  # x, y, width, height, JPEG length
+TILE_COUNT = struct.Struct("<H")
+PROTOCOL_VERSION = 1
+MSG_FULL_FRAME = 1
+MSG_DELTA_FRAME = 2
+
+# Connection protocols
+PROTOCOL_BINARY = "binary"
+PROTOCOL_JSON = "json"  # Legacy base64 JSON frames for old viewer pages
+PROTOCOL_MJPEG = "mjpeg"  # multipart/x-mixed-replace over plain HTTP
+
+MJPEG_BOUNDARY = "frame"
+
+# Renditions are (max_width, quality) pairs; max_width 0 means full resolution
+DEFAULT_QUALITY = 85
+MIN_QUALITY = 10
+MAX_QUALITY = 95
+DEFAULT_RENDITION = (0, DEFAULT_QUALITY)
+
+def normalize_rendition(max_width: int = 0, quality: int = DEFAULT_QUALITY) -> Tuple[int, int]:
+    """Clamp requested rendition parameters so equivalent requests share one encode"""
+    max_width = max(0, int(max_width))
+    if 0 < max_width < 64:
+        max_width = 64
+    quality = min(MAX_QUALITY, max(MIN_QUALITY, int(quality)))
+    return (max_width, quality)
+
+class StreamFrame:
+    """Encoded frame shared by every connection, serialized lazily per protocol"""
+    def __init__(self, jpeg: Optional[bytes], width: int, height: int, sequence: int, timestamp: float,
+                 tiles: Optional[List[Tuple[int, int, int, int, bytes]]] = None,
+                 rendition: Tuple[int, int] = DEFAULT_RENDITION):
+        self.jpeg = jpeg
+        self.tiles = tiles  # Changed tiles for delta frames, None for keyframes
+        self.rendition = rendition
+        self.width = width
+        self.height = height
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self._binary = None
+        self._json = None
+
+    @property
+    def keyframe(self) -> bool:
+        return self.tiles is None
+
+    @classmethod
+    def from_binary(cls, data: bytes, rendition: Tuple[int, int] = DEFAULT_RENDITION) -> "StreamFrame":
+        """Rebuild a frame from its binary message (used by separate web server processes)"""
+        _, message_type, _, sequence, timestamp, _, _, width, height = FRAME_HEADER.unpack_from(data)
+        offset = FRAME_HEADER.size
+        if message_type == MSG_FULL_FRAME:
+            frame = cls(data[offset:], width, height, sequence, timestamp, rendition=rendition)
+        else:
+            (count,) = TILE_COUNT.unpack_from(data, offset)
+            offset += TILE_COUNT.size
+            tiles = []
+            for _ in range(count):
+                x, y, w, h, length = TILE_HEADER.unpack_from(data, offset)
+                offset += TILE_HEADER.size
+                tiles.append((x, y, w, h, data[offset:offset + length]))
+                offset += length
+            frame = cls(None, width, height, sequence, timestamp, tiles=tiles, rendition=rendition)
+        frame._binary = data
+        return frame
+
+    def to_binary(self) -> bytes:
+        """Header + payload for send_bytes"""
+        if self._binary is None:
+            message_type = MSG_FULL_FRAME if self.keyframe else MSG_DELTA_FRAME
+            header = FRAME_HEADER.pack(PROTOCOL_VERSION, message_type, 0,
+                                       self.sequence & 0xFFFFFFFF, self.timestamp,
+                                       0, 0, self.width, self.height)
+            if self.keyframe:
+                self._binary = header + self.jpeg
+            else:
+                parts = [header, TILE_COUNT.pack(len(self.tiles))]
+                for x, y, w, h, jpeg in self.tiles:
+                    parts.append(TILE_HEADER.pack(x, y, w, h, len(jpeg)))
+                    parts.append(jpeg)
+                self._binary = b"".join(parts)
+        return self._binary
+
+    def to_json(self) -> str:
+        """Legacy {"frame": base64} payload for send_text"""
+        if self._json is None:
+            frame_b64 = base64.b64encode(self.jpeg).decode('utf-8')
+            self._json = json.dumps({"frame": frame_b64})
+        return self._json
+
+# Adaptive quality ladder, best first: (max_width, quality, max_fps)
+QUALITY_LADDER = [
+    (0, 85, 30),
+    (0, 70, 30),
+    (1280, 70, 25),
+    (960, 60, 20),
+    (640, 50, 15),
+    (480, 40, 10),
+    (320, 30, 5),
+]
+TARGET_LATENCY_MS = 150.0
+
+class AdaptiveController:
+    """
+    Moves a viewer along QUALITY_LADDER to hold a target latency.
+
+    Steps down as soon as a report exceeds the target or too many frames are
+    dropped, and steps back up only after several comfortably good reports.
+    """
+    SETTLE_SECONDS = 2.0  # Minimum time between changes, so a new level gets measured
+    GOOD_REPORTS_TO_STEP_UP = 3
+    HISTORY_LENGTH = 50
+
+    def __init__(self, rendition: Tuple[int, int] = DEFAULT_RENDITION, target_latency_ms: float = TARGET_LATENCY_MS):
+        self.target_latency_ms = target_latency_ms
+        self.level = self.start_level(rendition)
+        self.good_reports = 0
+        self.last_change = time.monotonic()
+        self.last_latency_ms = 0.0
+        self.last_drop_ratio = 0.0
+        self.history = deque(maxlen=self.HISTORY_LENGTH)
+
+    @staticmethod
+    def start_level(rendition: Tuple[int, int]) -> int:
+        """Best ladder level that doesn't exceed what the viewer asked for"""
+        max_width, quality = rendition
+        for level, (level_width, level_quality, _) in enumerate(QUALITY_LADDER):
+            fits_width = max_width == 0 or (level_width != 0 and level_width <= max_width)
+            if fits_width and level_quality <= quality:
+                return level
+        return len(QUALITY_LADDER) - 1
+
+    @property
+    def settings(self) -> Tuple[int, int, int]:
+        return QUALITY_LADDER[self.level]
+
+    def update(self, latency_ms: float, drop_ratio: float) -> bool:
+        """Feed one report; returns True when the level changed"""
+        self.last_latency_ms = latency_ms
+        self.last_drop_ratio = drop_ratio
+        now = time.monotonic()
+        if now - self.last_change < self.SETTLE_SECONDS:
+            return False
+
+        if latency_ms > self.target_latency_ms or drop_ratio > 0.25:
+            self.good_reports = 0
+            if self.level < len(QUALITY_LADDER) - 1:
+                return self._change(self.level + 1, now, "down", latency_ms, drop_ratio)
+        elif latency_ms < self.target_latency_ms * 0.5 and drop_ratio < 0.05:
+            self.good_reports += 1
+            if self.good_reports >= self.GOOD_REPORTS_TO_STEP_UP and self.level > 0:
+                self.good_reports = 0
+                return self._change(self.level - 1, now, "up", latency_ms, drop_ratio)
+        else:
+            self.good_reports = 0
+        return False
+
+    def _change(self, level, now, direction, latency_ms, drop_ratio) -> bool:
+        self.level = level
+        self.last_change = now
+        max_width, quality, fps = self.settings
+        self.history.append({
+            "time": round(time.time(), 3),
+            "direction": direction,
+            "level": level,
+            "max_width": max_width,
+            "quality": quality,
+            "max_fps": fps,
+            "latency_ms": round(latency_ms, 1),
+            "drop_ratio": round(drop_ratio, 3),
+        })
+        return True
+
+    def stats(self) -> dict:
+        max_width, quality, fps = self.settings
+        return {
+            "level": self.level,
+            "max_width": max_width,
+            "quality": quality,
+            "max_fps": fps,
+            "target_latency_ms": self.target_latency_ms,
+            "latency_ms": round(self.last_latency_ms, 1),
+            "drop_ratio": round(self.last_drop_ratio, 3),
+            "history": list(self.history),
+        }
+
+def merge_deltas(older: StreamFrame, newer: StreamFrame) -> StreamFrame:
+    """Combine two consecutive delta frames into one; tiles from the newer frame win"""
+    tiles = {(tile[0], tile[1]): tile for tile in older.tiles}
+    for tile in newer.tiles:
+        tiles[(tile[0], tile[1])] = tile
+    return StreamFrame(None, newer.width, newer.height, newer.sequence, newer.timestamp,
+                       tiles=list(tiles.values()), rendition=newer.rendition)
+
+def coalesce_frames(frames: List[StreamFrame]) -> List[StreamFrame]:
+    """
+    Reduce a backlog of frames to what a viewer still needs to see the latest picture.
+
+    Everything before the last keyframe is dropped and the deltas after it are merged,
+    so the result is at most [keyframe, delta].
+    """
+    result = []
+    for frame in frames:
+        if frame.keyframe:
+            result = [frame]
+        elif result and not result[-1].keyframe:
+            result[-1] = merge_deltas(result[-1], frame)
+        else:
+            result.append(frame)
+    return result
+
+class ClientConnection:
+    """
+    Active viewer connection with its own frame slot.
+
+    New frames are coalesced into the slot instead of being queued, so a slow
+    client skips frames on its own without holding up anybody else. WebSocket
+    viewers are served by a sender task (run), MJPEG viewers by iter_mjpeg.
+    """
+    def __init__(self, connection_id: int, websocket: Optional[WebSocket], protocol: str,
+                 rendition: Tuple[int, int] = DEFAULT_RENDITION, max_fps: float = 0,
+                 client=None, adaptive: bool = False):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.protocol = protocol
+        self.rendition = rendition
+        self.max_fps = max(0.0, float(max_fps))  # 0 = as fast as frames arrive
+        self.next_send = 0.0
+        client = client or (websocket.client if websocket is not None else None)
+        self.address = f"{client.host}:{client.port}" if client else "unknown"
+        self.connected_at = time.time()
+        # Delta frames are useless until the viewer has a keyframe to apply them to
+        self.awaiting_keyframe = True
+        self.pending: List[StreamFrame] = []
+        self.pending_since = 0.0
+        self.holding = False  # Sender is waiting out the frame rate cap
+        self.frame_ready = asyncio.Event()
+        self.sender_task = None
+
+        # Counters
+        self.frames_sent = 0
+        self.frames_dropped = 0  # Skipped because the client fell behind
+        self.frames_merged = 0  # Coalesced while held back by the frame rate cap
+        self.bytes_sent = 0
+        self.last_latency_ms = 0.0
+        self.avg_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.avg_send_ms = 0.0
+        self.client_report = {}
+        self._report_counters = (0, 0)
+
+        # Quality follows client feedback when adaptive
+        self.adaptive = None
+        if adaptive:
+            self.adaptive = AdaptiveController(rendition)
+            self._apply_adaptive_settings()
+
+    def _apply_adaptive_settings(self):
+        max_width, quality, fps = self.adaptive.settings
+        self.rendition = normalize_rendition(max_width, quality)
+        self.max_fps = float(fps)
+
+    def handle_feedback(self, report: dict):
+        """
+        Take a viewer report (decode_ms, fps, backlog) and adjust quality if adaptive.
+
+        Runs on the server loop. When the rendition changes the slot is reset and a
+        keyframe of the new rendition is requested.
+        """
+        self.client_report = report
+        if self.adaptive is None:
+            return
+
+        sent = self.frames_sent - self._report_counters[0]
+        dropped = self.frames_dropped - self._report_counters[1]
+        self._report_counters = (self.frames_sent, self.frames_dropped)
+        drop_ratio = dropped / (sent + dropped) if sent + dropped else 0.0
+
+        # Time a frame spends waiting here, on the wire and in the viewer's decoder,
+        # plus whatever the viewer still has queued for drawing
+        decode_ms = float(report.get("decode_ms", 0))
+        backlog = float(report.get("backlog", 0))
+        latency_ms = self.avg_latency_ms + self.avg_send_ms + decode_ms * (1 + backlog)
+
+        if self.adaptive.update(latency_ms, drop_ratio):
+            self._apply_adaptive_settings()
+            self.pending = []
+            self.frame_ready.clear()
+            self.awaiting_keyframe = True
+            _notify_connections_changed()
+            if client_connected_callback is not None:
+                client_connected_callback(self.rendition)
+
+    def offer(self, frame: StreamFrame):
+        """Put a frame into this client's slot (event loop thread only)"""
+        if frame.rendition != self.rendition:
+            return
+        if not frame.keyframe and (self.protocol != PROTOCOL_BINARY or self.awaiting_keyframe):
+            return
+        if frame.keyframe:
+            self.awaiting_keyframe = False
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        queued = len(self.pending) + 1
+        self.pending = coalesce_frames(self.pending + [frame])
+        # Frames the cap would have skipped anyway don't mean the client is too slow
+        if self.holding or time.monotonic() < self.next_send:
+            self.frames_merged += queued - len(self.pending)
+        else:
+            self.frames_dropped += queued - len(self.pending)
+        self.frame_ready.set()
+
+    async def take_frames(self) -> List[StreamFrame]:
+        """Wait until the slot has frames and this client's frame rate cap allows sending"""
+        await self.frame_ready.wait()
+        # Latency counts from when the frames could have been sent, not including the cap wait
+        ready_since = max(self.pending_since, self.next_send)
+        if self.max_fps > 0:
+            # Frame rate cap: let the slot coalesce until this client's next send time
+            delay = self.next_send - time.monotonic()
+            if delay > 0:
+                self.holding = True
+                try:
+                    await asyncio.sleep(delay)
+                finally:
+                    self.holding = False
+            self.next_send = time.monotonic() + 1.0 / self.max_fps
+        self.frame_ready.clear()
+        frames = self.pending
+        self.pending = []
+        if not frames:
+            # Slot was reset while waiting (rendition change)
+            return frames
+        latency_ms = max(0.0, time.monotonic() - ready_since) * 1000.0
+        self.last_latency_ms = latency_ms
+        self.avg_latency_ms = latency_ms if self.avg_latency_ms == 0 else self.avg_latency_ms * 0.9 + latency_ms * 0.1
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        return frames
+
+    async def run(self):
+        """Send whatever is in the slot whenever it fills up"""
+        try:
+            while True:
+                for frame in await self.take_frames():
+                    await self.send_frame(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Connection probably closed; make sure the receive loop notices
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+
+    async def send_frame(self, frame: StreamFrame):
+        started = time.monotonic()
+        if self.protocol == PROTOCOL_BINARY:
+            data = frame.to_binary()
+            await self.websocket.send_bytes(data)
+        else:
+            data = frame.to_json()
+            await self.websocket.send_text(data)
+        send_ms = (time.monotonic() - started) * 1000.0
+        self.avg_send_ms = send_ms if self.frames_sent == 0 else self.avg_send_ms * 0.9 + send_ms * 0.1
+        self.frames_sent += 1
+        self.bytes_sent += len(data)
+
+    async def iter_mjpeg(self):
+        """Yield multipart parts for an MJPEG response, reusing the encoded JPEG bytes as-is"""
+        while True:
+            for frame in await self.take_frames():
+                part = (f"--{MJPEG_BOUNDARY}\r\n"
+                        f"Content-Type: image/jpeg\r\n"
+                        f"Content-Length: {len(frame.jpeg)}\r\n\r\n").encode("ascii")
+                yield part
+                yield frame.jpeg
+                yield b"\r\n"
+                self.frames_sent += 1
+                self.bytes_sent += len(part) + len(frame.jpeg) + 2
+
+    def stats(self) -> dict:
+        """Per-client counters for the /stats endpoint"""
+        return {
+            "id": self.connection_id,
+            "address": self.address,
+            "protocol": self.protocol,
+            "max_width": self.rendition[0],
+            "quality": self.rendition[1],
+            "max_fps": self.max_fps,
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "frames_merged": self.frames_merged,
+            "bytes_sent": self.bytes_sent,
+            "queue_latency_ms": round(self.last_latency_ms, 2),
+            "avg_queue_latency_ms": round(self.avg_latency_ms, 2),
+            "max_queue_latency_ms": round(self.max_latency_ms, 2),
+            "pending_frames": len(self.pending),
+            "avg_send_ms": round(self.avg_send_ms, 2),
+            "client_report": self.client_report,
+            "adaptive": self.adaptive.stats() if self.adaptive is not None else None,
+        }
+
+def diff_state(old: dict, new: dict) -> Optional[dict]:
+    """
+    Describe how the field model changed between two snapshots.
+
+    Returns None when nothing changed, otherwise a dict with the changed canvas
+    properties, the changed properties of each added/modified field, and the
+    IDs of removed fields.
+    """
+    canvas = {key: value for key, value in new["canvas"].items() if old["canvas"].get(key) != value}
+    fields = {}
+    for field_id, field in new["fields"].items():
+        old_field = old["fields"].get(field_id)
+        if old_field is None:
+            fields[field_id] = field
+        else:
+            changed = {key: value for key, value in field.items() if old_field.get(key) != value}
+            if changed:
+                fields[field_id] = changed
+    removed = [field_id for field_id in old["fields"] if field_id not in new["fields"]]
+    if not canvas and not fields and not removed:
+        return None
+    return {"canvas": canvas, "fields": fields, "removed": removed}
+
+class StateConnection:
+    """
+    Viewer that renders the field model itself instead of receiving pixels.
+
+    Diffs must be applied in order, so they are queued rather than coalesced;
+    a client that falls too far behind gets a fresh snapshot instead.
+    """
+    MAX_BACKLOG = 10
+
+    def __init__(self, connection_id: int, websocket: WebSocket):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        client = websocket.client
+        self.address = f"{client.host}:{client.port}" if client else "unknown"
+        self.connected_at = time.time()
+        self.pending: List[str] = []
+        self.message_ready = asyncio.Event()
+        self.sender_task = None
+
+        # Counters
+        self.messages_sent = 0
+        self.snapshots_sent = 0
+        self.bytes_sent = 0
+
+    def offer_snapshot(self, message: str):
+        """Replace anything queued with a full snapshot"""
+        self.pending = [message]
+        self.snapshots_sent += 1
+        self.message_ready.set()
+
+    def offer_diff(self, message: str):
+        if len(self.pending) >= self.MAX_BACKLOG:
+            self.offer_snapshot(_state_message("snapshot", current_state))
+            return
+        self.pending.append(message)
+        self.message_ready.set()
+
+    async def run(self):
+        """Send queued snapshots and diffs"""
+        try:
+            while True:
+                await self.message_ready.wait()
+                self.message_ready.clear()
+                messages = self.pending
+                self.pending = []
+                for message in messages:
+                    await self.websocket.send_text(message)
+                    self.messages_sent += 1
+                    self.bytes_sent += len(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Connection probably closed; make sure the receive loop notices
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        """Per-client counters for the /stats endpoint"""
+        return {
+            "id": self.connection_id,
+            "address": self.address,
+            "protocol": "state",
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+            "messages_sent": self.messages_sent,
+            "snapshots_sent": self.snapshots_sent,
+            "bytes_sent": self.bytes_sent,
+            "pending_messages": len(self.pending),
+        }
+
 # Store active connections
-connections: Dict[int, WebSocket] = {}
+connections: Dict[int, ClientConnection] = {}
 connection_counter = 0
+frame_sequence = itertools.count()
+
+# Called (from the server thread) whenever a viewer connects
+client_connected_callback = None
+
+# Called (from the server thread) whenever viewers come, go or change rendition
+connections_changed_callback = None
+
+# Called (from the server thread) when a field model viewer needs a model before one was published
+state_requested_callback = None
 
-# Queue for new frames
-frame_queue = Queue(maxsize=1)  # Only keep latest frame
+# Field model viewers and the last published model
+state_connections: Dict[int, StateConnection] = {}
+current_state: Optional[dict] = None
+state_version = 0
+
+# Event loop of the running server; frames from the Qt side are handed over with call_soon_threadsafe
+server_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Running uvicorn server, so stop_server can shut it down
+server = None
 
 # HTML template for the viewer page
 HTML_TEMPLATE = """
@@ -45,18 +568,260 @@ HTML_TEMPLATE = """
     </style>
 </head>
 <body>
-    <img id="display" src="">
+    <canvas id="display"></canvas>
     <script>
-        const ws = new WebSocket(`ws://${window.location.host}/ws`);
+        const HEADER_SIZE = 24;  // Must match FRAME_HEADER in web_server.py
+        const TILE_HEADER_SIZE = 12;  // Must match TILE_HEADER in web_server.py
+        const MSG_FULL_FRAME = 1;
+        const MSG_DELTA_FRAME = 2;
+        // Rendition options (max_width, quality, fps) on the page URL are passed through to /ws
+        const params = new URLSearchParams(window.location.search);
+        if (!params.has('protocol')) {
+            params.set('protocol', 'binary');
+        }
+        if (!params.has('adaptive') && !params.has('max_width') && !params.has('quality')) {
+            params.set('adaptive', '1');
+        }
+        const ws = new WebSocket(`ws://${window.location.host}/ws?${params}`);
+        ws.binaryType = 'arraybuffer';
         const display = document.getElementById('display');
+        const context = display.getContext('2d');
+        let lastSequence = -1;
+        let haveKeyframe = false;
+        let drawQueue = Promise.resolve();  // Keeps async tile decodes in message order
+        
+        // Feedback for the server's adaptive quality controller
+        let framesReceived = 0;
+        let decodeTotalMs = 0;
+        let framesDecoded = 0;
+        let backlog = 0;
+        let lastReport = performance.now();
+        
+        function drawJpeg(bytes, x, y) {
+            return createImageBitmap(new Blob([bytes], {type: 'image/jpeg'})).then(bitmap => {
+                context.drawImage(bitmap, x, y);
+                bitmap.close();
+            });
+        }
+        
+        function handleFrame(buffer) {
+            const header = new DataView(buffer, 0, HEADER_SIZE);
+            const type = header.getUint8(1);
+            const sequence = header.getUint32(4, true);
+            const width = header.getUint16(20, true);
+            const height = header.getUint16(22, true);
+            if (sequence <= lastSequence && lastSequence - sequence < 1000) {
+                return Promise.resolve();  // Stale frame
+            }
+            lastSequence = sequence;
+            
+            if (type === MSG_FULL_FRAME) {
+                if (display.width !== width || display.height !== height) {
+                    display.width = width;
+                    display.height = height;
+                }
+                haveKeyframe = true;
+                return drawJpeg(new Uint8Array(buffer, HEADER_SIZE), 0, 0);
+            }
+            
+            if (type !== MSG_DELTA_FRAME || !haveKeyframe) {
+                return Promise.resolve();
+            }
+            const view = new DataView(buffer);
+            const count = view.getUint16(HEADER_SIZE, true);
+            let offset = HEADER_SIZE + 2;
+            const draws = [];
+            for (let i = 0; i < count; i++) {
+                const x = view.getUint16(offset, true);
+                const y = view.getUint16(offset + 2, true);
+                const length = view.getUint32(offset + 8, true);
+                offset += TILE_HEADER_SIZE;
+                draws.push(drawJpeg(new Uint8Array(buffer, offset, length), x, y));
+                offset += length;
+            }
+            return Promise.all(draws);
+        }
         
         ws.onmessage = function(event) {
-            const data = JSON.parse(event.data);
-            if (data.frame) {
-                display.src = 'data:image/jpeg;base64,' + data.frame;
+            if (typeof event.data === 'string') {
+                // Legacy JSON/base64 frame
+                const data = JSON.parse(event.data);
+                if (data.frame) {
+                    const image = new Image();
+                    image.onload = () => {
+                        display.width = image.naturalWidth;
+                        display.height = image.naturalHeight;
+                        context.drawImage(image, 0, 0);
+                    };
+                    image.src = 'data:image/jpeg;base64,' + data.frame;
+                }
+                return;
             }
+            framesReceived++;
+            backlog++;
+            drawQueue = drawQueue.then(() => {
+                const started = performance.now();
+                return handleFrame(event.data).then(() => {
+                    decodeTotalMs += performance.now() - started;
+                    framesDecoded++;
+                });
+            }).catch(error => console.log(error)).then(() => {
+                backlog--;
+            });
         };
         
+        setInterval(() => {
+            if (ws.readyState !== WebSocket.OPEN) {
+                return;
+            }
+            const now = performance.now();
+            ws.send(JSON.stringify({
+                type: 'feedback',
+                fps: framesReceived * 1000 / (now - lastReport),
+                decode_ms: framesDecoded ? decodeTotalMs / framesDecoded : 0,
+                backlog: backlog
+            }));
+            framesReceived = 0;
+            decodeTotalMs = 0;
+            framesDecoded = 0;
+            lastReport = now;
+        }, 1000);
+        
+        ws.onclose = function() {
+            console.log('Connection closed, attempting to reconnect...');
+            setTimeout(() => {
+                window.location.reload();
+            }, 1000);
+        };
+    </script>
+</body>
+</html>
+"""
+
+# HTML template for the field model viewer, which renders fields with HTML/CSS instead of pixels
+STATE_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Companion Viewer</title>
+    <style>
+        body {
+            margin: 0;
+            padding: 0;
+            background: #000;
+            min-height: 100vh;
+            overflow: hidden;
+        }
+        #canvas {
+            position: absolute;
+            left: 0;
+            top: 0;
+            overflow: hidden;
+            transform-origin: 0 0;
+        }
+        .field {
+            position: absolute;
+            box-sizing: border-box;
+            display: flex;
+            flex-direction: column;
+            overflow: hidden;
+        }
+        .field.border {
+            border: 1px solid white;
+        }
+        .title {
+            margin-top: 10px;
+            text-align: center;
+            white-space: pre;
+        }
+        .content {
+            flex: 1;
+            display: flex;
+            flex-direction: column;
+            justify-content: center;
+            margin: 10px 0;
+            text-align: center;
+            white-space: pre;
+        }
+    </style>
+</head>
+<body>
+    <div id="canvas"></div>
+    <script>
+        const canvas = document.getElementById('canvas');
+        const ws = new WebSocket(`ws://${window.location.host}/ws/state`);
+        let model = {canvas: {width: 0, height: 0, background: '#000000'}, fields: {}};
+        const elements = {};
+        
+        function fitCanvas() {
+            const c = model.canvas;
+            if (!c.width || !c.height) {
+                return;
+            }
+            canvas.style.width = c.width + 'px';
+            canvas.style.height = c.height + 'px';
+            canvas.style.background = c.background;
+            const scale = Math.min(window.innerWidth / c.width, window.innerHeight / c.height);
+            const left = (window.innerWidth - c.width * scale) / 2;
+            const top = (window.innerHeight - c.height * scale) / 2;
+            canvas.style.transform = `translate(${left}px, ${top}px) scale(${scale})`;
+        }
+        
+        function styleText(element, item) {
+            element.textContent = item.text;
+            element.style.fontFamily = `"${item.font_family}"`;
+            element.style.fontSize = item.font_size + 'pt';
+            element.style.color = item.font_color;
+        }
+        
+        function renderField(id) {
+            const field = model.fields[id];
+            let element = elements[id];
+            if (!element) {
+                element = document.createElement('div');
+                element.className = 'field';
+                element.appendChild(document.createElement('div')).className = 'title';
+                element.appendChild(document.createElement('div')).className = 'content';
+                canvas.appendChild(element);
+                elements[id] = element;
+            }
+            element.style.left = field.x + 'px';
+            element.style.top = field.y + 'px';
+            element.style.width = field.width + 'px';
+            element.style.height = field.height + 'px';
+            element.style.visibility = field.visible ? 'visible' : 'hidden';
+            element.classList.toggle('border', field.show_border);
+            styleText(element.children[0], field.title);
+            styleText(element.children[1], field.content);
+        }
+        
+        function removeField(id) {
+            if (elements[id]) {
+                elements[id].remove();
+                delete elements[id];
+            }
+            delete model.fields[id];
+        }
+        
+        ws.onmessage = function(event) {
+            const message = JSON.parse(event.data);
+            if (message.type === 'snapshot') {
+                Object.keys(elements).forEach(removeField);
+                model = {canvas: message.canvas, fields: message.fields};
+                Object.keys(model.fields).forEach(renderField);
+            } else if (message.type === 'diff') {
+                Object.assign(model.canvas, message.canvas);
+                message.removed.forEach(removeField);
+                for (const [id, changes] of Object.entries(message.fields)) {
+                    model.fields[id] = Object.assign(model.fields[id] || {}, changes);
+                    renderField(id);
+                }
+            }
+            fitCanvas();
+        };
+        
+        window.onresize = fitCanvas;
+        
         ws.onclose = function() {
             console.log('Connection closed, attempting to reconnect...');
             setTimeout(() => {
@@ -72,75 +837,269 @@ HTML_TEMPLATE = """
 async def get():
     return HTMLResponse(content=HTML_TEMPLATE)
 
+@app.get("/state", response_class=HTMLResponse)
+async def get_state_viewer():
+    return HTMLResponse(content=STATE_TEMPLATE)
+
+@app.get("/stats")
+async def get_stats():
+    renditions = {}
+    for connection in list(connections.values()):
+        key = f"{connection.rendition[0] or 'full'}@q{connection.rendition[1]}"
+        renditions[key] = renditions.get(key, 0) + 1
+    return JSONResponse(content={
+        "renditions": renditions,
+        "clients": [connection.stats() for connection in list(connections.values())],
+        "state_clients": [connection.stats() for connection in list(state_connections.values())],
+        "state_version": state_version,
+    })
+
+@app.get("/mjpeg")
+async def mjpeg_endpoint(request: Request, max_width: int = 0, quality: int = DEFAULT_QUALITY, fps: float = 0):
+    """MJPEG stream for players that can't run the JavaScript viewer"""
+    connection = _register_connection(None, PROTOCOL_MJPEG, normalize_rendition(max_width, quality), fps,
+                                      client=request.client)
+
+    async def stream():
+        try:
+            async for chunk in connection.iter_mjpeg():
+                yield chunk
+        finally:
+            connections.pop(connection.connection_id, None)
+            _notify_connections_changed()
+
+    return StreamingResponse(stream(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+                             headers={"Cache-Control": "no-cache, no-store", "Pragma": "no-cache"})
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, protocol: str = PROTOCOL_JSON,
+                             max_width: int = 0, quality: int = DEFAULT_QUALITY, fps: float = 0,
+                             adaptive: bool = False):
+    await websocket.accept()
+    
+    # Clients that don't ask for the binary protocol get legacy JSON frames
+    if protocol != PROTOCOL_BINARY:
+        protocol = PROTOCOL_JSON
+    
+    connection = _register_connection(websocket, protocol, normalize_rendition(max_width, quality), fps,
+                                      adaptive=adaptive)
+    connection_id = connection.connection_id
+    connection.sender_task = asyncio.create_task(connection.run())
+    
+    try:
+        # Frames are pushed by the sender task; here we only wait for messages or the close
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text"):
+                try:
+                    data = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if isinstance(data, dict) and data.get("type") == "feedback":
+                    connection.handle_feedback(data)
+    except:
+        pass
+    finally:
+        connection.sender_task.cancel()
+        connections.pop(connection_id, None)
+        _notify_connections_changed()
+
+@app.websocket("/ws/state")
+async def state_endpoint(websocket: WebSocket):
     global connection_counter
     await websocket.accept()
     
-    # Assign unique ID to this connection
     connection_id = connection_counter
     connection_counter += 1
-    connections[connection_id] = websocket
+    connection = StateConnection(connection_id, websocket)
+    connection.sender_task = asyncio.create_task(connection.run())
+    state_connections[connection_id] = connection
+    _notify_connections_changed()
+    if current_state is not None:
+        connection.offer_snapshot(_state_message("snapshot", current_state))
+    elif state_requested_callback is not None:
+        # Nothing published yet, ask the display for its model (no pixel keyframe needed)
+        state_requested_callback()
     
     try:
         while True:
-            # Keep connection alive and wait for frames
-            await asyncio.sleep(0.016)  # ~60fps max
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
     except:
         pass
     finally:
-        del connections[connection_id]
+        connection.sender_task.cancel()
+        state_connections.pop(connection_id, None)
+        _notify_connections_changed()
 
-def broadcast_frame(image_data: bytes):
-    """Broadcast frame to all connected clients"""
-    if not connections:
+def _register_connection(websocket, protocol, rendition, fps, client=None, adaptive=False) -> ClientConnection:
+    """Create a connection with a unique ID and ask the display for a fresh frame"""
+    global connection_counter
+    connection_id = connection_counter
+    connection_counter += 1
+    connection = ClientConnection(connection_id, websocket, protocol, rendition, fps,
+                                  client=client, adaptive=adaptive)
+    connections[connection_id] = connection
+    _notify_connections_changed()
+    if client_connected_callback is not None:
+        client_connected_callback(connection.rendition)
+    return connection
+
+def _notify_connections_changed():
+    if connections_changed_callback is not None:
+        connections_changed_callback()
+
+def set_connections_changed_callback(callback):
+    """Register a callable invoked whenever viewers connect, disconnect or switch rendition"""
+    global connections_changed_callback
+    connections_changed_callback = callback
+
+def set_client_connected_callback(callback):
+    """Register a callable invoked as callback(rendition) whenever a new viewer connects"""
+    global client_connected_callback
+    client_connected_callback = callback
+
+def set_state_requested_callback(callback):
+    """Register a callable invoked as callback() when a field model viewer is waiting for a model"""
+    global state_requested_callback
+    state_requested_callback = callback
+
+def has_clients() -> bool:
+    """Whether any pixel (WebSocket or MJPEG) viewer is connected"""
+    return bool(connections)
+
+def has_state_clients() -> bool:
+    """Whether any field model viewer is connected"""
+    return bool(state_connections)
+
+def _state_message(message_type: str, body: dict) -> str:
+    return json.dumps({"type": message_type, "version": state_version, **body})
+
+def publish_state(state: dict):
+    """
+    Publish the field model to state viewers (callable from any thread).
+
+    The state is a dict with "canvas" (width, height, background) and "fields"
+    (field ID -> geometry, visibility, border, title and content). Viewers get a
+    snapshot when they connect and only the differences after that.
+    """
+    loop = server_loop
+    if loop is None:
+        return
+    try:
+        loop.call_soon_threadsafe(_dispatch_state, state)
+    except RuntimeError:
+        # Loop already closed
+        pass
+
+def _dispatch_state(state: dict):
+    """Diff the new model against the last one and queue it for state viewers (runs on the server loop)"""
+    global current_state, state_version
+    if current_state is None:
+        state_version += 1
+        current_state = state
+        message = _state_message("snapshot", state)
+        for connection in list(state_connections.values()):
+            connection.offer_snapshot(message)
         return
-        
-    # Convert to base64
-    frame_b64 = base64.b64encode(image_data).decode('utf-8')
-    data = json.dumps({"frame": frame_b64})
     
-    # Put in queue for broadcasting
+    changes = diff_state(current_state, state)
+    if changes is None:
+        return
+    state_version += 1
+    current_state = state
+    message = _state_message("diff", changes)
+    for connection in list(state_connections.values()):
+        connection.offer_diff(message)
+
+def active_renditions() -> Dict[Tuple[int, int], bool]:
+    """
+    Renditions requested by connected viewers.
+
+    Maps (max_width, quality) to whether delta frames may be used, which is only
+    the case when no legacy JSON viewer shares that rendition. A rendition
+    disappears from this map as soon as its last viewer disconnects.
+    """
+    renditions = {}
+    for connection in list(connections.values()):
+        allow_delta = connection.protocol == PROTOCOL_BINARY
+        renditions[connection.rendition] = renditions.get(connection.rendition, True) and allow_delta
+    return renditions
+
+def _queue_frame(frame: StreamFrame):
+    """Hand a frame to the server loop (callable from any thread)"""
+    loop = server_loop
+    if loop is None:
+        return
     try:
-        frame_queue.put_nowait(data)
-    except:
-        # Queue full, skip frame
+        loop.call_soon_threadsafe(_dispatch_frame, frame)
+    except RuntimeError:
+        # Loop already closed
         pass
 
-async def broadcast_worker():
-    """Worker to broadcast frames from queue"""
-    while True:
-        try:
-            if not frame_queue.empty():
-                data = frame_queue.get_nowait()
-                # Broadcast to all connections
-                for conn_id, websocket in list(connections.items()):
-                    try:
-                        await websocket.send_text(data)
-                    except:
-                        # Connection probably closed
-                        try:
-                            del connections[conn_id]
-                        except:
-                            pass
-        except:
-            pass
-        await asyncio.sleep(0.016)  # ~60fps max
-
-def start_server(host: str = "0.0.0.0", port: int = 8181):
-    """Start the FastAPI server"""
+def _dispatch_frame(frame: StreamFrame):
+    """Put a frame into every client's slot (runs on the server loop)"""
+    for connection in list(connections.values()):
+        connection.offer(frame)
+
+def broadcast_frame(image_data: bytes, width: int = 0, height: int = 0,
+                    rendition: Tuple[int, int] = DEFAULT_RENDITION):
+    """Broadcast frame to all clients watching the given rendition"""
+    if not connections:
+        return
+        
+    # Serialization happens lazily per protocol, so binary-only audiences never pay for base64
+    _queue_frame(StreamFrame(image_data, width, height, next(frame_sequence), time.time() * 1000.0,
+                             rendition=rendition))
+
+def broadcast_message(data: bytes, rendition: Tuple[int, int] = DEFAULT_RENDITION):
+    """Broadcast an already serialized binary frame message (keyframe or delta)"""
+    if not connections:
+        return
+    _queue_frame(StreamFrame.from_binary(data, rendition))
+
+def broadcast_delta(tiles: List[Tuple[int, int, int, int, bytes]], width: int, height: int,
+                    rendition: Tuple[int, int] = DEFAULT_RENDITION):
+    """Broadcast changed tiles (x, y, w, h, jpeg) to clients that already have a keyframe"""
+    if not connections:
+        return
+    _queue_frame(StreamFrame(None, width, height, next(frame_sequence), time.time() * 1000.0,
+                             tiles=tiles, rendition=rendition))
+
+def start_server(host: str = "0.0.0.0", port: int = 8181, sockets=None):
+    """
+    Start the FastAPI server.
+
+    Args:
+        host (str): Interface to listen on
+        port (int): Port to listen on
+        sockets (list): Already bound listening sockets to serve instead (shared by worker processes)
+    """
     import uvicorn
     from contextlib import asynccontextmanager
     
     @asynccontextmanager
     async def lifespan(app: FastAPI):
-        # Start broadcast worker on server startup
-        task = asyncio.create_task(broadcast_worker())
+        # Frames can only be delivered once the loop is known
+        global server_loop
+        server_loop = asyncio.get_running_loop()
         yield
-        # Cancel broadcast worker on server shutdown
-        task.cancel()
+        server_loop = None
         
     app.router.lifespan_context = lifespan
     
     # Run server
-    uvicorn.run(app, host=host, port=port)
+    global server
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port))
+    try:
+        server.run(sockets=sockets)
+    finally:
+        server = None
+
+def stop_server():
+    """Ask a server started with start_server (on another thread) to shut down"""
+    if server is not None:
+        server.should_exit = True